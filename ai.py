@@ -1,6 +1,13 @@
 import os
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+import httpx
+import aioredis
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 # Load .env file explicitly
 load_dotenv()
@@ -10,16 +17,79 @@ api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     raise RuntimeError("OPENAI_API_KEY not found in environment")
 
-client = OpenAI(api_key=api_key)
+# One long-lived client: TCP/TLS connections are pooled across replies
+client = AsyncOpenAI(
+    api_key=api_key,
+    http_client=httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=30
+    )
+)
 
+# Shared reply cache across workers when Redis is configured
+REDIS_URL = os.getenv("REDIS_URL")
 
-def generate_reply(
-    user_message: str,
-    history: str = "",
-    business_name: str = "our business",
-    business_goal: str = "help customers"
-):
-    system_prompt = f"""
+redis = aioredis.from_url(REDIS_URL, decode_responses=True) if REDIS_URL else None
+
+# Reply cache: key -> (expires_at, reply), oldest first
+REPLY_CACHE_SIZE = 2048
+REPLY_CACHE_TTL = 3600  # seconds
+
+_reply_cache = OrderedDict()
+
+
+def _cache_key(user_message, history, business_name, business_goal):
+    raw = "\x1f".join((business_name, business_goal, history, user_message))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _local_get(key):
+    entry = _reply_cache.get(key)
+    if not entry:
+        return None
+    expires_at, reply = entry
+    if expires_at < time.monotonic():
+        del _reply_cache[key]
+        return None
+    _reply_cache.move_to_end(key)
+    return reply
+
+
+def _local_set(key, reply, ttl):
+    _reply_cache[key] = (time.monotonic() + ttl, reply)
+    _reply_cache.move_to_end(key)
+    while len(_reply_cache) > REPLY_CACHE_SIZE:
+        _reply_cache.popitem(last=False)
+
+
+async def _cache_get(key):
+    reply = _local_get(key)
+    if reply is not None or redis is None:
+        return reply
+    try:
+        return await redis.get(f"ai:reply:{key}")
+    except Exception:
+        return None
+
+
+async def _cache_set(key, reply, ttl):
+    _local_set(key, reply, ttl)
+    if redis is None:
+        return
+    try:
+        await redis.set(f"ai:reply:{key}", reply, ex=ttl)
+    except Exception:
+        pass
+
+
+# History sent to the model is capped to keep prompts (and cost) bounded
+HISTORY_MAX_CHARS = 4000
+
+
+@lru_cache(maxsize=256)
+def _system_prompt(business_name, business_goal):
+    # Byte-identical per business so OpenAI prompt caching can match the prefix
+    return f"""
 You are a friendly WhatsApp assistant for {business_name}.
 
 Your main goal is to {business_goal}.
@@ -31,17 +101,70 @@ Rules:
 - Never mention AI or OpenAI
 """
 
-    messages = [{"role": "system", "content": system_prompt}]
+
+def build_messages(
+    user_message: str,
+    history: str = "",
+    business_name: str = "our business",
+    business_goal: str = "help customers"
+):
+    messages = [
+        {"role": "system", "content": _system_prompt(business_name, business_goal)}
+    ]
 
     if history:
-        messages.append({"role": "assistant", "content": history})
+        messages.append({"role": "assistant", "content": history[-HISTORY_MAX_CHARS:]})
 
     messages.append({"role": "user", "content": user_message})
 
-    response = client.chat.completions.create(
+    return messages
+
+
+async def _complete(messages):
+    response = await client.chat.completions.create(
         model="gpt-4o-mini",
         messages=messages,
         temperature=0.4
     )
 
     return response.choices[0].message.content.strip()
+
+
+# Requests in flight: key -> Task. An identical prompt arriving while one
+# is already being answered awaits that request instead of sending another
+_inflight = {}
+
+
+async def _complete_once(key, messages):
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_complete(messages))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: one caller being cancelled must not cancel the shared request
+    return await asyncio.shield(task)
+
+
+async def generate_reply(
+    user_message: str,
+    history: str = "",
+    business_name: str = "our business",
+    business_goal: str = "help customers",
+    cache_ttl: int = REPLY_CACHE_TTL
+):
+    key = _cache_key(user_message, history, business_name, business_goal)
+
+    if cache_ttl > 0:
+        cached = await _cache_get(key)
+        if cached is not None:
+            return cached
+
+    messages = build_messages(user_message, history, business_name, business_goal)
+
+    reply = await _complete_once(key, messages)
+
+    if cache_ttl > 0:
+        await _cache_set(key, reply, cache_ttl)
+
+    return reply
+
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, select
 from database import SessionLocal
 from models import Conversation, Booking
 
@@ -8,35 +8,32 @@ def get_business_analytics(business_id: int):
     db = SessionLocal()
     now = datetime.utcnow()
     today = now.date()
-
-    total_conversations = db.query(Conversation).filter(
-        Conversation.business_id == business_id
-    ).count()
-
-    interested = db.query(Conversation).filter(
-        Conversation.business_id == business_id,
-        Conversation.stage.in_(["Interested", "Followup_1", "Followup_2"])
-    ).count()
-
-    bookings = db.query(Booking).filter(
-        Booking.business_id == business_id,
-        Booking.status == "Booked"
-    ).count()
-
-    cancelled = db.query(Booking).filter(
-        Booking.business_id == business_id,
-        Booking.status == "Cancelled"
-    ).count()
-
-    today_bookings = db.query(Booking).filter(
-        Booking.business_id == business_id,
-        Booking.created_at >= datetime.combine(today, datetime.min.time())
-    ).count()
-
-    upcoming = db.query(Booking).filter(
-        Booking.business_id == business_id,
-        Booking.status == "Booked"
-    ).count()
+    today_start = datetime.combine(today, datetime.min.time())
+
+    # One statement per table; COUNT(*) FILTER (WHERE ...) lets Postgres
+    # answer every counter from the (business_id, ...) composite index
+    total_conversations, interested = db.execute(
+        select(
+            func.count(),
+            func.count().filter(
+                Conversation.stage.in_(["Interested", "Followup_1", "Followup_2"])
+            )
+        ).where(
+            Conversation.business_id == business_id
+        )
+    ).one()
+
+    bookings, cancelled, today_bookings = db.execute(
+        select(
+            func.count().filter(Booking.status == "Booked"),
+            func.count().filter(Booking.status == "Cancelled"),
+            func.count().filter(Booking.created_at >= today_start)
+        ).where(
+            Booking.business_id == business_id
+        )
+    ).one()
+
+    upcoming = bookings
 
     conversion_rate = (
         round((bookings / total_conversations) * 100, 2)
@@ -1,11 +1,43 @@
+import os
+
+from passlib.context import CryptContext
 from database import SessionLocal
 from models import Business
 
+# Cheap bcrypt in development; only legacy hashes still use it
+BCRYPT_ROUNDS = int(os.getenv(
+    "BCRYPT_ROUNDS", 4 if os.getenv("ENVIRONMENT", "production") == "development" else 12
+))
+
+# The one password context (main.py imports it). New hashes are argon2id;
+# existing bcrypt hashes still verify and are upgraded on the next
+# successful login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__time_cost=2,
+    argon2__memory_cost=19456,  # KiB
+    argon2__parallelism=1,
+    bcrypt__rounds=BCRYPT_ROUNDS
+)
+
 def authenticate_business(email: str, password: str):
     db = SessionLocal()
+    # Point lookup on the unique admin_email index; the hash is checked in Python
     business = db.query(Business).filter(
-        Business.admin_email == email,
-        Business.admin_password == password
+        Business.admin_email == email.strip().lower()
     ).first()
     db.close()
-    return business
+
+    if not business:
+        return None
+
+    try:
+        # verify compares digests in constant time
+        if pwd_context.verify(password, business.admin_password):
+            return business
+    except ValueError:
+        # Stored value is not a recognised hash
+        pass
+
+    return None
@@ -1,69 +1,118 @@
+import asyncio
+import logging
 from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload, raiseload
 from database import SessionLocal
-from models import Booking, Business
-from send_whatsapp import send_whatsapp_message
-from date_utils import combine_booking_datetime
+from models import Booking
+from send_whatsapp import send_whatsapp_message_async, close_async_client
 
+logger = logging.getLogger("bizflow.reminders")
 
-def run_booking_reminders():
+# Max reminder sends in flight against Twilio at once
+MAX_CONCURRENT_SENDS = 50
+
+# Statuses the WhatsApp booking flow writes for bookings still going ahead
+ACTIVE_STATUSES = ("pending", "confirmed")
+
+
+async def run_booking_reminders():
     db = SessionLocal()
     now = datetime.utcnow()
 
-    bookings = db.query(Booking).filter(
-        Booking.status == "Booked"
+    window_24h = (now + timedelta(hours=23), now + timedelta(hours=24))
+    window_2h = (now + timedelta(hours=1, minutes=50), now + timedelta(hours=2))
+
+    # Only bookings that are due for a reminder right now leave the DB.
+    # Business is joined in the same SELECT; anything else lazy-loaded
+    # here raises instead of silently issuing a query per booking
+    bookings = db.query(Booking).options(
+        joinedload(Booking.business),
+        raiseload("*")
+    ).filter(
+        Booking.status.in_(ACTIVE_STATUSES),
+        or_(
+            and_(
+                Booking.reminder_24h_sent == False,
+                Booking.booking_datetime_utc.between(*window_24h)
+            ),
+            and_(
+                Booking.reminder_2h_sent == False,
+                Booking.booking_datetime_utc.between(*window_2h)
+            )
+        )
     ).all()
 
+    # (booking, flag to set once sent, message)
+    due = []
+
     for b in bookings:
-        business = db.query(Business).filter(
-            Business.id == b.business_id
-        ).first()
+        business = b.business
 
         if not business:
             continue
 
-        booking_dt = combine_booking_datetime(
-            b.booking_date,
-            b.booking_time,
-            business.timezone
-        )
+        booking_dt = b.booking_datetime_utc
 
         # ⏰ 24 HOUR REMINDER
         if (
             not b.reminder_24h_sent
-            and now >= booking_dt - timedelta(hours=24)
-            and now < booking_dt - timedelta(hours=23)
+            and window_24h[0] <= booking_dt <= window_24h[1]
         ):
-            send_whatsapp_message(
-                b.phone,
+            due.append((
+                b,
+                "reminder_24h_sent",
                 (
                     f"⏰ Reminder!\n"
                     f"Your FREE trial at *{business.name}* "
                     f"is *tomorrow at {b.booking_time}* 💪"
                 )
-            )
-            b.reminder_24h_sent = True
+            ))
 
         # ⏰ 2 HOUR REMINDER
         elif (
             not b.reminder_2h_sent
-            and now >= booking_dt - timedelta(hours=2)
-            and now < booking_dt - timedelta(hours=1, minutes=50)
+            and window_2h[0] <= booking_dt <= window_2h[1]
         ):
-            send_whatsapp_message(
-                b.phone,
+            due.append((
+                b,
+                "reminder_2h_sent",
                 (
                     f"🔥 Almost time!\n"
                     f"Your FREE trial at *{business.name}* "
                     f"starts in *2 hours* 🏋️"
                 )
-            )
-            b.reminder_2h_sent = True
+            ))
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+
+    async def send(phone, message):
+        async with semaphore:
+            await send_whatsapp_message_async(phone, message)
 
+    try:
+        results = await asyncio.gather(
+            *(send(b.phone, message) for b, _, message in due),
+            return_exceptions=True
+        )
+    finally:
+        await close_async_client()
+
+    # Only mark reminders that actually went out; failures retry next run
+    sent = 0
+    for (b, flag, _), result in zip(due, results):
+        if isinstance(result, Exception):
+            logger.error(f"Reminder failed for booking {b.id}: {result}")
+            continue
+        setattr(b, flag, True)
         db.add(b)
+        sent += 1
 
     db.commit()
     db.close()
+    logger.info(f"Sent {sent} of {len(due)} due reminders")
 
 
 if __name__ == "__main__":
-    run_booking_reminders()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(run_booking_reminders())
@@ -6,6 +6,22 @@ SCOPES = ["https://www.googleapis.com/auth/calendar"]
 SERVICE_ACCOUNT_FILE = "google_calendar.json"
 CALENDAR_ID = "primary"  # or your specific calendar ID
 
+# Built once per process: reading the key file and building the discovery
+# client is far more expensive than the insert itself
+_service = None
+
+
+def get_calendar_service():
+    global _service
+    if _service is None:
+        creds = service_account.Credentials.from_service_account_file(
+            SERVICE_ACCOUNT_FILE, scopes=SCOPES
+        )
+        _service = build(
+            "calendar", "v3", credentials=creds, cache_discovery=False
+        )
+    return _service
+
 
 def create_calendar_event(
     name: str,
@@ -13,11 +29,7 @@ def create_calendar_event(
     date_str: str,
     time_str: str,
 ):
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SCOPES
-    )
-
-    service = build("calendar", "v3", credentials=creds)
+    service = get_calendar_service()
 
     # TEMP SIMPLE PARSING (we’ll improve later)
     start_time = datetime.now().replace(hour=18, minute=0, second=0)
@@ -40,3 +52,4 @@ def create_calendar_event(
         calendarId=CALENDAR_ID,
         body=event
     ).execute()
+
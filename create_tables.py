@@ -0,0 +1,14 @@
+"""
+Create missing tables and apply schema upgrades once per deploy (Railway
+preDeployCommand), so app workers never touch the schema on boot in
+production. See migrations.py.
+"""
+import logging
+
+import migrations
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("bizflow.create_tables")
+
+migrations.upgrade()
+logger.info("Tables verified/created and upgraded")
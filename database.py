@@ -1,7 +1,10 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import os
 
+import orjson
+
 # Get database URL from environment variable, fallback to SQLite for development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./bizflow.db")
 
@@ -9,22 +12,44 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./bizflow.db")
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# JSON columns (payment_data, audit details, temp_data) go through orjson
+def _json_dumps(obj) -> str:
+    return orjson.dumps(obj).decode()
+
+JSON_OPTIONS = {"json_serializer": _json_dumps, "json_deserializer": orjson.loads}
+
+# Connection pools are per process. Railway (and uvicorn's default) run one
+# worker, which gets the full pools: sync 20+30 and async 20+10, at most 80
+# connections. With WEB_CONCURRENCY workers each pool is divided by the
+# worker count, so the host stays at about 80 (within Postgres' default
+# max_connections=100, leaving room for pre-deploy and cron jobs).
+# DB_POOL_SIZE / DB_MAX_OVERFLOW set both engines' pools explicitly.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+
+def _pool_setting(name: str, single_worker: int) -> int:
+    if os.getenv(name):
+        return int(os.getenv(name))
+    return max(single_worker // WEB_CONCURRENCY, 2)
+
 # Create engine with appropriate settings
 if DATABASE_URL and DATABASE_URL.startswith("sqlite"):
     # SQLite configuration (for local development)
     engine = create_engine(
         DATABASE_URL,
-        connect_args={"check_same_thread": False}
+        connect_args={"check_same_thread": False},
+        **JSON_OPTIONS
     )
 else:
     # PostgreSQL configuration (for production)
     engine = create_engine(
         DATABASE_URL,
-        pool_size=5,               # Number of connections to keep in pool
-        max_overflow=10,            # Maximum overflow connections
+        pool_size=_pool_setting("DB_POOL_SIZE", 20),        # Connections kept open
+        max_overflow=_pool_setting("DB_MAX_OVERFLOW", 30),  # Extra connections under burst
         pool_pre_ping=True,         # Test connections before using
-        pool_recycle=3600,          # Recycle connections after 1 hour
-        echo=False                  # Set to True for SQL logging (development only)
+        pool_recycle=1800,          # Recycle connections after 30 minutes
+        pool_use_lifo=True,         # Reuse the warmest connection; idle extras age out
+        echo=False,                 # Set to True for SQL logging (development only)
+        **JSON_OPTIONS
     )
 
 # Create session factory
@@ -34,13 +59,46 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Async engine for routes that await the database instead of blocking the
+# event loop (asyncpg for PostgreSQL, aiosqlite for local SQLite)
+if DATABASE_URL.startswith("sqlite"):
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **JSON_OPTIONS)
+else:
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=_pool_setting("DB_POOL_SIZE", 20),
+        max_overflow=_pool_setting("DB_MAX_OVERFLOW", 10),
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        pool_use_lifo=True,
+        echo=False,
+        **JSON_OPTIONS
+    )
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False   # attributes stay readable after commit (no lazy IO)
+)
+
 # Base class for models
 Base = declarative_base()
 
-# Dependency for FastAPI
+# Dependency for FastAPI. FastAPI resolves a dependency once per request, so
+# the route and its decorators (admin_required, ...) share this one session.
 def get_db():
     db = SessionLocal()
     try:
         yield db
+    except Exception:
+        # Hand the connection back to the pool clean, not mid-transaction
+        db.rollback()
+        raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
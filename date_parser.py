@@ -1,8 +1,8 @@
 import dateparser
 from datetime import datetime
-import pytz
+from date_utils import get_tz
 
-IST = pytz.timezone("Asia/Kolkata")
+IST = get_tz("Asia/Kolkata")
 
 
 def parse_datetime(text: str):
@@ -1,16 +1,43 @@
 from datetime import datetime
-import pytz
+from functools import lru_cache
+from zoneinfo import ZoneInfo
 
-def combine_booking_datetime(date_str, time_str, timezone):
+UTC = ZoneInfo("UTC")
+
+
+@lru_cache(maxsize=64)
+def get_tz(name):
     """
-    Converts booking date + time (string) into UTC datetime
+    Cached tzinfo lookup (zoneinfo parses the tz database on a miss)
     """
-    tz = pytz.timezone(timezone)
+    return ZoneInfo(name)
 
+
+def combine_booking_datetime(date_str, time_str, timezone, fmt="%d %b %Y %I:%M %p"):
+    """
+    Converts booking date + time (string) into UTC datetime
+    """
     local_dt = datetime.strptime(
         f"{date_str} {time_str}",
-        "%d %b %Y %I:%M %p"
+        fmt
     )
 
-    localized = tz.localize(local_dt)
-    return localized.astimezone(pytz.utc)
+    localized = local_dt.replace(tzinfo=get_tz(timezone))
+    return localized.astimezone(UTC)
+
+
+def booking_datetime_utc(date_str, time_str, timezone):
+    """
+    Naive UTC datetime for a stored booking (DD-MM-YYYY, HH:MM in the
+    business timezone), or None when the stored strings don't parse
+    """
+    try:
+        return combine_booking_datetime(
+            date_str,
+            time_str,
+            timezone or "Asia/Kolkata",
+            fmt="%d-%m-%Y %H:%M"
+        ).replace(tzinfo=None)
+    except (ValueError, TypeError, KeyError):
+        # KeyError: unknown timezone name (ZoneInfoNotFoundError)
+        return None
@@ -5,17 +5,24 @@
 
 import sys
 import os
+import asyncio
 import logging
+import logging.handlers
+import atexit
+from queue import SimpleQueue
 import traceback
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Optional, Dict, Any, List, Union
 from contextlib import asynccontextmanager
-import json
+import orjson
 import secrets
 import hmac
-import hashlib
 import re
-from functools import wraps
+import mimetypes
+from functools import wraps, lru_cache
+from dataclasses import dataclass
+from types import MappingProxyType
+from collections import OrderedDict, deque
 import time
 
 # Third-party imports
@@ -23,10 +30,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # FastAPI & Related
-from fastapi import FastAPI, Request, Form, Depends, Response, HTTPException, status, Cookie
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
+from fastapi import FastAPI, Request, Form, Depends, Response, HTTPException, status, Cookie, BackgroundTasks
+from fastapi.responses import HTMLResponse, RedirectResponse, ORJSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
 from fastapi.staticfiles import StaticFiles
+from starlette.staticfiles import NotModifiedResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
@@ -38,19 +47,22 @@ from fastapi.exceptions import RequestValidationError
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.authentication import AuthenticationMiddleware
-from starlette.datastructures import MutableHeaders
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse
+from starlette.requests import HTTPConnection
+from itsdangerous.exc import BadSignature
 
 # Security
-from passlib.hash import bcrypt
-import bcrypt as bcrypt_lib
+from auth import pwd_context
 
 # Database
-from database import SessionLocal, engine
-from models import Base, Business, Booking, Payment, AuditLog, Conversation
+from database import SessionLocal, engine, AsyncSessionLocal, async_engine, get_db, get_async_db, WEB_CONCURRENCY
+from models import Business, Booking, Payment, AuditLog, Conversation
+from date_utils import booking_datetime_utc
+import migrations
 
 # Email
-import sendgrid
-from sendgrid.helpers.mail import Mail
+import httpx
 
 # Payments
 import razorpay
@@ -61,9 +73,11 @@ import aiofiles
 import csv
 from io import StringIO
 from twilio.twiml.messaging_response import MessagingResponse
+from xml.sax.saxutils import escape as xml_escape
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy import text, func, exists, insert, select, update, and_, or_, bindparam, case
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Rate limiting
 import aioredis
@@ -87,6 +101,11 @@ class Settings:
     
     # Database
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./bizflow.db")
+    # create_all on boot costs one catalog query per table; production
+    # schemas are created at deploy time instead (override with the env var)
+    AUTO_CREATE_TABLES = os.getenv(
+        "AUTO_CREATE_TABLES", str(ENVIRONMENT != "production")
+    ).lower() == "true"
     
     # Email
     SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
@@ -103,6 +122,7 @@ class Settings:
     LOGIN_TIMEOUT_MINUTES = 15
     SESSION_MAX_AGE = 60 * 60 * 24 * 14  # 14 days
     SESSION_REMEMBER_AGE = 60 * 60 * 24 * 30  # 30 days
+    SESSION_REFRESH_INTERVAL = 60 * 60  # slide an active session's expiry at most hourly
     
     # Rate Limiting
     RATE_LIMIT_GLOBAL = "100/minute"
@@ -112,6 +132,9 @@ class Settings:
     # Redis (optional)
     REDIS_URL = os.getenv("REDIS_URL", None)
     
+    # Compiled Jinja templates persisted across restarts (non-debug only)
+    JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR", "/tmp/jinja_cache")
+    
     @classmethod
     def validate(cls):
         """Validate critical settings"""
@@ -145,9 +168,19 @@ class CustomFormatter(logging.Formatter):
         logging.CRITICAL: bold_red
     }
 
+    def __init__(self):
+        super().__init__()
+        # One prebuilt formatter per level instead of a new one per record
+        self._formatters = {
+            level: logging.Formatter(
+                f"{color}%(asctime)s - %(name)s - %(levelname)s - %(message)s{self.reset}",
+                datefmt="%Y-%m-%d %H:%M:%S"
+            )
+            for level, color in self.FORMATS.items()
+        }
+
     def format(self, record):
-        log_fmt = f"{self.FORMATS.get(record.levelno)}%(asctime)s - %(name)s - %(levelname)s - %(message)s{self.reset}"
-        formatter = logging.Formatter(log_fmt, datefmt="%Y-%m-%d %H:%M:%S")
+        formatter = self._formatters.get(record.levelno, self._formatters[logging.INFO])
         return formatter.format(record)
 
 # Create logs directory
@@ -158,23 +191,34 @@ logger = logging.getLogger("bizflow")
 logger.setLevel(logging.DEBUG if settings.DEBUG else logging.INFO)
 
 # File handler
-file_handler = logging.FileHandler("logs/bizflow.log")
+file_handler = logging.handlers.RotatingFileHandler(
+    "logs/bizflow.log", maxBytes=10_000_000, backupCount=5
+)
 file_handler.setLevel(logging.INFO)
 file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 file_handler.setFormatter(file_formatter)
-logger.addHandler(file_handler)
 
 # Console handler
 console_handler = logging.StreamHandler()
 console_handler.setLevel(logging.DEBUG if settings.DEBUG else logging.INFO)
 console_handler.setFormatter(CustomFormatter())
-logger.addHandler(console_handler)
 
 # Error file handler
-error_handler = logging.FileHandler("logs/error.log")
+error_handler = logging.handlers.RotatingFileHandler(
+    "logs/error.log", maxBytes=10_000_000, backupCount=5
+)
 error_handler.setLevel(logging.ERROR)
 error_handler.setFormatter(file_formatter)
-logger.addHandler(error_handler)
+
+# Callers only enqueue the record; a listener thread does the actual writes
+log_queue = SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
+log_listener = logging.handlers.QueueListener(
+    log_queue, file_handler, console_handler, error_handler,
+    respect_handler_level=True
+)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 # =====================================================
 # RATE LIMITING
@@ -202,6 +246,24 @@ if settings.RAZORPAY_KEY and settings.RAZORPAY_SECRET:
         logger.error(f"❌ Razorpay client initialization failed: {str(e)}")
         razorpay_client = None
 
+# Webhook HMAC key, encoded once instead of per request
+RAZORPAY_WEBHOOK_KEY = (
+    settings.RAZORPAY_WEBHOOK_SECRET.encode() if settings.RAZORPAY_WEBHOOK_SECRET else None
+)
+# Checkout signatures are keyed with the API secret (same value the client uses)
+RAZORPAY_SECRET_KEY = (
+    settings.RAZORPAY_SECRET.strip().encode() if settings.RAZORPAY_SECRET else None
+)
+
+def verify_checkout_signature(data: dict):
+    """Razorpay's checkout check: HMAC-SHA256(order_id|payment_id) with the API secret"""
+    message = f"{data.get('razorpay_order_id', '')}|{data.get('razorpay_payment_id', '')}".encode()
+    expected = hmac.digest(RAZORPAY_SECRET_KEY, message, "sha256").hex().encode()
+    if not hmac.compare_digest(expected, str(data.get("razorpay_signature", "")).encode()):
+        raise razorpay.errors.SignatureVerificationError(
+            "Razorpay Signature Verification Failed"
+        )
+
 # =====================================================
 # LIFESPAN MANAGEMENT
 # =====================================================
@@ -220,16 +282,94 @@ async def lifespan(app: FastAPI):
     logger.info(f"📊 Rate Limiting: {'✅ Enabled' if settings.REDIS_URL else '⚠️ Using memory storage'}")
     logger.info("=" * 60)
     
-    # Create database tables
-    try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("✅ Database tables verified/created")
-    except Exception as e:
-        logger.error(f"❌ Database initialization failed: {str(e)}")
-        raise
+    # Create/upgrade database tables (production does this in the pre-deploy step)
+    if settings.AUTO_CREATE_TABLES:
+        try:
+            migrations.upgrade(engine)
+            logger.info("✅ Database tables verified/created")
+        except Exception as e:
+            logger.error(f"❌ Database initialization failed: {str(e)}")
+            raise
+    
+    # Compile every template up front so no request pays for it
+    for name in templates.env.list_templates(extensions=["html"]):
+        try:
+            templates.get_template(name)
+        except Exception as e:
+            logger.error(f"❌ Template {name} failed to compile: {str(e)}")
+    
+    # Background audit log writer
+    app.state.audit_queue = asyncio.Queue(maxsize=AUDIT_QUEUE_SIZE)
+    audit_task = asyncio.create_task(audit_writer(app.state.audit_queue))
+    
+    # Shared SendGrid HTTP client (keep-alive across sends, never blocks the loop)
+    app.state.sendgrid = None
+    if settings.SENDGRID_API_KEY:
+        app.state.sendgrid = httpx.AsyncClient(
+            base_url="https://api.sendgrid.com",
+            headers={"Authorization": f"Bearer {settings.SENDGRID_API_KEY}"},
+            timeout=10,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+    
+    # Outbound email: bounded queue, fixed number of senders
+    app.state.email_queue = asyncio.Queue(maxsize=EMAIL_QUEUE_SIZE)
+    email_tasks = [
+        asyncio.create_task(email_worker(app.state.email_queue))
+        for _ in range(EMAIL_WORKERS)
+    ]
+    
+    # Idle senders in the in-process webhook limiter
+    sweeper_task = asyncio.create_task(sweep_webhook_hits())
+    
+    # Razorpay webhook events, processed in batches off the request path
+    app.state.razorpay_queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+    razorpay_task = asyncio.create_task(razorpay_webhook_drainer(app.state.razorpay_queue))
+    
+    # Shared Redis pool (reused by every request instead of connect-per-call)
+    app.state.redis = None
+    if settings.REDIS_URL:
+        try:
+            app.state.redis = aioredis.from_url(
+                settings.REDIS_URL,
+                max_connections=50,
+                decode_responses=True
+            )
+            await app.state.redis.ping()
+            logger.info("✅ Redis connection pool ready")
+        except Exception as e:
+            logger.error(f"❌ Redis connection failed: {str(e)}")
     
     yield
     
+    sweeper_task.cancel()
+    
+    # Sentinel lets the drainer finish what is queued, then exit
+    await app.state.razorpay_queue.put(None)
+    await razorpay_task
+    
+    # One sentinel per worker, queued behind any pending emails
+    for _ in email_tasks:
+        await app.state.email_queue.put(None)
+    await asyncio.gather(*email_tasks)
+    app.state.email_queue = None
+    
+    if app.state.sendgrid:
+        await app.state.sendgrid.aclose()
+    
+    audit_task.cancel()
+    try:
+        await audit_task
+    except asyncio.CancelledError:
+        pass
+    drain_audit_queue(app.state.audit_queue)
+    app.state.audit_queue = None
+    
+    if app.state.redis:
+        await app.state.redis.close()
+    
+    await async_engine.dispose()
+    
     logger.info(f"👋 {settings.APP_NAME} shutting down...")
 
 # =====================================================
@@ -243,6 +383,7 @@ app = FastAPI(
     docs_url="/api/docs" if settings.DEBUG else None,
     redoc_url="/api/redoc" if settings.DEBUG else None,
     openapi_url="/api/openapi.json" if settings.DEBUG else None,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -255,30 +396,163 @@ app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # Security headers middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-        return response
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+]
+
+class SecurityHeadersMiddleware:
+    """Pure ASGI middleware: splices prebuilt headers into the response start message"""
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *SECURITY_HEADERS]
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
 
 # Performance monitoring middleware
 class PerformanceMiddleware(BaseHTTPMiddleware):
+    HEADER_THRESHOLD_NS = 100_000_000   # 100ms
+    SLOW_THRESHOLD_NS = 1_000_000_000   # 1s
+    
     async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+        if request.url.path.startswith("/static/"):
+            return await call_next(request)
+        
+        start_ns = time.perf_counter_ns()
         response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
+        elapsed_ns = time.perf_counter_ns() - start_ns
         
-        if process_time > 1.0:
-            logger.warning(f"Slow request: {request.method} {request.url.path} took {process_time:.2f}s")
+        if settings.DEBUG or elapsed_ns > self.HEADER_THRESHOLD_NS:
+            response.headers["X-Process-Time"] = f"{elapsed_ns / 1e9:.4f}"
+        
+        if elapsed_ns > self.SLOW_THRESHOLD_NS:
+            logger.warning(f"Slow request: {request.method} {request.url.path} took {elapsed_ns / 1e9:.2f}s")
         
         return response
 
+# Server-side sessions
+class RedisSessionMiddleware(SessionMiddleware):
+    """
+    Session store in Redis: the cookie only carries a signed session id.
+    Falls back to Starlette's signed-cookie sessions when Redis is not configured.
+    A "max_age" entry in the session overrides the default lifetime
+    (set by "remember me" on login). Expiry slides: once the cookie is older
+    than refresh_interval, the next request re-signs it and pushes the Redis
+    TTL out again. The signature itself is never accepted past max_lifetime.
+    
+    Ids are only ever minted here: a cookie whose id has no stored session
+    (expired, logged out or planted) is ignored, and regenerate_session()
+    moves a session to a fresh id (login). If Redis errors, the request is
+    served without a session rather than failing.
+    """
+    KEY_PREFIX = "session:"
+    REGENERATE_SCOPE_KEY = "session.regenerate"
+    
+    def __init__(self, app, max_lifetime: int = None, refresh_interval: int = 3600, **kwargs):
+        super().__init__(app, **kwargs)
+        self.max_lifetime = max_lifetime or self.max_age
+        self.refresh_interval = refresh_interval
+    
+    async def __call__(self, scope, receive, send):
+        redis = getattr(scope["app"].state, "redis", None) if "app" in scope else None
+        if redis is None or scope["type"] not in ("http", "websocket"):
+            return await super().__call__(scope, receive, send)
+        
+        connection = HTTPConnection(scope)
+        session_id = None
+        cookie_age = 0.0
+        loaded = {}
+        store_ok = True
+        
+        cookie = connection.cookies.get(self.session_cookie)
+        if cookie:
+            try:
+                # Per-session expiry is the Redis TTL; the signature bounds the id
+                # to the longest lifetime any session may have
+                value, signed_at = self.signer.unsign(
+                    cookie.encode(), max_age=self.max_lifetime, return_timestamp=True
+                )
+                session_id = value.decode()
+                cookie_age = time.time() - signed_at.timestamp()
+            except (BadSignature, ValueError):
+                session_id = None
+        
+        if session_id:
+            try:
+                raw = await redis.get(self.KEY_PREFIX + session_id)
+                loaded = orjson.loads(raw) if raw else {}
+            except ValueError:
+                loaded = {}
+            except Exception as e:
+                logger.warning(f"Session store read failed: {str(e)}")
+                store_ok = False
+            if not loaded:
+                # Never adopt a client-supplied id that has no stored session
+                session_id = None
+        
+        scope["session"] = dict(loaded)
+        
+        async def send_wrapper(message):
+            nonlocal session_id
+            if message["type"] == "http.response.start" and store_ok:
+                session = scope["session"]
+                headers = MutableHeaders(scope=message)
+                try:
+                    if session_id and (not session or scope.get(self.REGENERATE_SCOPE_KEY)):
+                        # Logout drops the stored session; login moves it to a new id
+                        await redis.delete(self.KEY_PREFIX + session_id)
+                        session_id = None
+                        if not session:
+                            headers.append(
+                                "Set-Cookie",
+                                f"{self.session_cookie}=null; path={self.path}; "
+                                f"expires=Thu, 01 Jan 1970 00:00:00 GMT; {self.security_flags}"
+                            )
+                    if session:
+                        is_new = session_id is None
+                        if is_new:
+                            session_id = secrets.token_urlsafe(32)
+                        max_age = session.get("max_age", self.max_age)
+                        refresh = not is_new and cookie_age > self.refresh_interval
+                        # Unchanged sessions cost no Redis write and no cookie
+                        # until it is time to slide the expiry
+                        if is_new or session != loaded:
+                            await redis.set(
+                                self.KEY_PREFIX + session_id,
+                                orjson.dumps(session),
+                                ex=max_age
+                            )
+                        elif refresh:
+                            await redis.expire(self.KEY_PREFIX + session_id, max_age)
+                        if is_new or refresh or max_age != loaded.get("max_age", self.max_age):
+                            signed = self.signer.sign(session_id.encode()).decode()
+                            headers.append(
+                                "Set-Cookie",
+                                f"{self.session_cookie}={signed}; path={self.path}; "
+                                f"Max-Age={max_age}; {self.security_flags}"
+                            )
+                except Exception as e:
+                    logger.warning(f"Session store write failed: {str(e)}")
+            await send(message)
+        
+        await self.app(scope, receive, send_wrapper)
+
+def regenerate_session(request: Request):
+    """Move the session to a freshly minted id when the response is sent"""
+    request.scope[RedisSessionMiddleware.REGENERATE_SCOPE_KEY] = True
+
 # Add middleware in correct order
 app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(
@@ -305,13 +579,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(
-    SessionMiddleware,
+    RedisSessionMiddleware,
     secret_key=settings.SECRET_KEY,
     max_age=settings.SESSION_MAX_AGE,
+    max_lifetime=settings.SESSION_REMEMBER_AGE,
+    refresh_interval=settings.SESSION_REFRESH_INTERVAL,
     same_site="lax",
     https_only=settings.ENVIRONMENT == "production"
 )
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Level 1: most of gzip's size win for a fraction of level 9's CPU
+app.add_middleware(GZipMiddleware, minimum_size=1500, compresslevel=1)
 app.add_middleware(PerformanceMiddleware)
 
 # =====================================================
@@ -319,19 +596,79 @@ app.add_middleware(PerformanceMiddleware)
 # =====================================================
 
 templates = Jinja2Templates(directory="templates")
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-# =====================================================
-# DATABASE DEPENDENCY
-# =====================================================
+if not settings.DEBUG:
+    # Templates only change on deploy: skip the per-render mtime check and
+    # reuse compiled bytecode across restarts
+    os.makedirs(settings.JINJA_CACHE_DIR, exist_ok=True)
+    templates.env.auto_reload = False
+    templates.env.bytecode_cache = FileSystemBytecodeCache(settings.JINJA_CACHE_DIR)
+    # Unbounded compiled-template cache (what cache_size=-1 builds): a plain
+    # dict hit instead of the locked LRU shuffle on every render
+    templates.env.cache = {}
+
+STATIC_MAX_AGE = 86400  # plain names can change in place; fingerprinted ones can't
+STATIC_FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{8,}\.[^./]+$")
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """
+    Whether an Accept-Encoding header allows `encoding`: listed (or covered
+    by "*") with a non-zero q-value. "gzip;q=0" refuses gzip.
+    """
+    wildcard = False
+    for part in accept_encoding.lower().split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == encoding:
+            return q > 0
+        if coding == "*":
+            wildcard = q > 0
+    return wildcard
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with cache headers and precompressed .br/.gz siblings
+    (written at build time by precompress_static.py)
+    """
+    
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+    
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        full_path = str(full_path)
+        request_headers = Headers(scope=scope)
+        accept = request_headers.get("accept-encoding", "")
+        
+        for encoding, suffix in self.ENCODINGS:
+            encoded_path = full_path + suffix
+            if accepts_encoding(accept, encoding) and os.path.isfile(encoded_path):
+                # GZipMiddleware leaves responses with Content-Encoding alone
+                response = FileResponse(
+                    encoded_path,
+                    status_code=status_code,
+                    stat_result=os.stat(encoded_path),
+                    media_type=mimetypes.guess_type(full_path)[0] or "text/plain",
+                    method=scope["method"],
+                    headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+                )
+                if self.is_not_modified(response.headers, request_headers):
+                    response = NotModifiedResponse(response.headers)
+                break
+        else:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+        
+        if STATIC_FINGERPRINT_RE.search(full_path):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = f"public, max-age={STATIC_MAX_AGE}"
+        return response
 
-def get_db() -> Session:
-    """Get database session with automatic cleanup"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # =====================================================
 # DECORATORS & HELPERS
@@ -344,7 +681,7 @@ def login_required(func):
         if not request.session.get("business_id"):
             request.session["next"] = request.url.path
             return RedirectResponse("/login", 302)
-        return await func(request, *args, **kwargs)
+        return await func(*args, request=request, **kwargs)
     return wrapper
 
 def admin_required(func):
@@ -355,11 +692,11 @@ def admin_required(func):
             request.session["next"] = request.url.path
             return RedirectResponse("/login", 302)
         
-        user = db.query(Business).get(request.session["business_id"])
+        user = await get_business_snapshot(request.session["business_id"], db)
         if not user or not user.is_admin:
             return RedirectResponse("/dashboard", 302)
         
-        return await func(request, db, *args, **kwargs)
+        return await func(*args, request=request, db=db, **kwargs)
     return wrapper
 
 def rate_limit(limit: str):
@@ -371,17 +708,36 @@ def rate_limit(limit: str):
 # =====================================================
 
 def hash_password(password: str) -> str:
-    """Hash password with bcrypt"""
-    return bcrypt.hash(password)
+    """Hash password with the preferred scheme (argon2id)"""
+    return pwd_context.hash(password)
 
 def verify_password(password: str, hashed: str) -> bool:
     """Verify password against hash"""
-    return bcrypt.verify(password, hashed)
+    return verify_and_update_password(password, hashed)[0]
+
+def verify_and_update_password(password: str, hashed: str) -> tuple:
+    """
+    Returns (is_valid, new_hash); new_hash is set when the stored hash uses
+    a deprecated scheme or settings and should be replaced
+    """
+    try:
+        return pwd_context.verify_and_update(password, hashed)
+    except (ValueError, TypeError):
+        # Stored value is not a recognised hash
+        return False, None
+
+@lru_cache(maxsize=1)
+def dummy_password_hash() -> str:
+    """Hash checked against when the login email is unknown, so both paths cost one hash"""
+    return hash_password(secrets.token_urlsafe(16))
 
 def generate_token() -> str:
     """Generate secure random token"""
     return secrets.token_urlsafe(32)
 
+PASSWORD_DIGITS = frozenset("0123456789")
+PASSWORD_SPECIALS = frozenset("!@#$%^&*()_+-=[]{}|;:,.<>?")
+
 def validate_password_strength(password: str) -> tuple:
     """
     Validate password strength
@@ -389,37 +745,163 @@ def validate_password_strength(password: str) -> tuple:
     """
     if len(password) < 8:
         return False, "Password must be at least 8 characters"
-    if not any(c.isupper() for c in password):
+    # One set build, then C-level checks instead of a generator per rule;
+    # a string has an uppercase letter iff lowercasing it changes it
+    chars = set(password)
+    if password == password.lower():
         return False, "Password must contain at least one uppercase letter"
-    if not any(c.islower() for c in password):
+    if password == password.upper():
         return False, "Password must contain at least one lowercase letter"
-    if not any(c.isdigit() for c in password):
+    if chars.isdisjoint(PASSWORD_DIGITS):
         return False, "Password must contain at least one number"
-    if not any(c in "!@#$%^&*()_+-=[]{}|;:,.<>?" for c in password):
+    if chars.isdisjoint(PASSWORD_SPECIALS):
         return False, "Password must contain at least one special character"
     return True, "Password is strong"
 
+# Characters stripped by sanitize_input (str.translate runs in C, no regex)
+SANITIZE_TABLE = str.maketrans('', '', '<>\'"')
+
 def sanitize_input(text: str) -> str:
     """Sanitize user input"""
     if not text:
         return ""
-    return re.sub(r'[<>\'"]', '', text)
+    return text.translate(SANITIZE_TABLE)
+
+AUDIT_QUEUE_SIZE = 10_000
+AUDIT_BATCH_SIZE = 256
+AUDIT_FLUSH_SECONDS = 0.5
 
 def log_audit(user_id: int, action: str, details: dict = None, db: Session = None):
-    """Log audit event"""
+    """Log audit event (queued for the background writer when the app is running)"""
+    event = {
+        "user_id": user_id,
+        "action": action,
+        "details": details or {},
+        "created_at": datetime.utcnow()
+    }
+    
+    queue = getattr(app.state, "audit_queue", None)
+    if queue is not None:
+        try:
+            queue.put_nowait(event)
+            return
+        except asyncio.QueueFull:
+            # Writer is behind: fall back to writing inline rather than drop it
+            if not db:
+                logger.error(f"Audit queue full, dropping '{action}' event")
+                return
+            logger.warning(f"Audit queue full, writing '{action}' inline")
+    
     if db:
         try:
-            audit = AuditLog(
-                user_id=user_id,
-                action=action,
-                details=details or {},
-                created_at=datetime.utcnow()
-            )
-            db.add(audit)
+            db.add(AuditLog(**event))
             db.commit()
         except Exception as e:
             logger.error(f"Audit log error: {str(e)}")
 
+def write_audit_batch(batch: list):
+    """Insert a batch of audit events with one executemany INSERT"""
+    db = SessionLocal()
+    try:
+        db.execute(insert(AuditLog), batch)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Audit log error ({len(batch)} events dropped): {str(e)}")
+    finally:
+        db.close()
+
+async def audit_writer(queue: asyncio.Queue):
+    """Drain audit events in batches of AUDIT_BATCH_SIZE or every AUDIT_FLUSH_SECONDS"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + AUDIT_FLUSH_SECONDS
+        
+        try:
+            while len(batch) < AUDIT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Shutting down mid-window: don't lose what was already dequeued
+            write_audit_batch(batch)
+            raise
+        
+        await run_in_threadpool(write_audit_batch, batch)
+
+def drain_audit_queue(queue: asyncio.Queue):
+    """Synchronously flush whatever is still queued (shutdown path)"""
+    batch = []
+    while not queue.empty():
+        batch.append(queue.get_nowait())
+    if batch:
+        write_audit_batch(batch)
+
+# =====================================================
+# EMAIL SERVICE
+# =====================================================
+
+class EmailService:
+    """Transactional email via SendGrid"""
+    
+    @classmethod
+    def _get_template(cls, template: str, context: dict) -> str:
+        """Render templates/email/<template>.html (autoescaped, compiled once)"""
+        return templates.get_template(f"email/{template}.html").render(**context)
+    
+    @classmethod
+    async def send_email(cls, to_email: str, subject: str, template: str, context: dict = None) -> bool:
+        """Send a templated email; returns False instead of raising"""
+        client = getattr(app.state, "sendgrid", None)
+        if client is None:
+            logger.warning(f"SendGrid not configured, skipping '{template}' email to {to_email}")
+            return False
+        
+        try:
+            html_content = cls._get_template(template, context or {})
+            response = await client.post("/v3/mail/send", json={
+                "personalizations": [{"to": [{"email": to_email}]}],
+                "from": {"email": settings.FROM_EMAIL},
+                "subject": subject,
+                "content": [{"type": "text/html", "value": html_content}]
+            })
+            if response.status_code != 202:
+                logger.error(f"SendGrid rejected '{template}' email to {to_email}: {response.status_code} {response.text}")
+            return response.status_code == 202
+        except Exception as e:
+            logger.error(f"Email error ({template} -> {to_email}): {str(e)}")
+            return False
+    
+    @classmethod
+    def enqueue(cls, to_email: str, subject: str, template: str, context: dict = None) -> bool:
+        """Hand an email to the background senders; False if dropped"""
+        queue = getattr(app.state, "email_queue", None)
+        if queue is None:
+            logger.warning(f"Email queue not running, dropping '{template}' email to {to_email}")
+            return False
+        try:
+            queue.put_nowait((to_email, subject, template, context))
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"Email queue full, dropping '{template}' email to {to_email}")
+            return False
+
+EMAIL_QUEUE_SIZE = 1000
+EMAIL_WORKERS = 4
+
+async def email_worker(queue: asyncio.Queue):
+    """Send queued emails one at a time; None stops the worker"""
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        await EmailService.send_email(*item)
+
 # =====================================================
 # AUTHENTICATION HELPERS
 # =====================================================
@@ -428,12 +910,181 @@ def is_logged(req: Request) -> bool:
     """Check if user is logged in"""
     return bool(req.session.get("business_id"))
 
-def get_user(req: Request, db: Session):
-    """Get current user from session"""
+def get_user(req: Request, db: Session, *columns):
+    """Get current user from session (optionally loading only `columns`)"""
+    bid = req.session.get("business_id")
+    if not bid:
+        return None
+    options = [load_only(*columns)] if columns else None
+    return db.get(Business, bid, options=options)
+
+async def get_user_async(req: Request, db: AsyncSession, *columns):
+    """get_user for routes on the async session"""
     bid = req.session.get("business_id")
     if not bid:
         return None
-    return db.query(Business).get(bid)
+    options = [load_only(*columns)] if columns else None
+    return await db.get(Business, bid, options=options)
+
+# Booking columns the booking tables show (dashboard and bookings page)
+BOOKING_LIST_COLUMNS = (
+    Booking.id, Booking.name, Booking.phone, Booking.booking_date,
+    Booking.booking_time, Booking.status, Booking.created_at
+)
+
+# Business columns each hot path actually reads; anything else lazy-loads
+DASHBOARD_BUSINESS_COLUMNS = (
+    Business.name, Business.business_type, Business.is_admin, Business.plan,
+    Business.chat_used, Business.chat_period, Business.chat_limit,
+    Business.trial_ends_at, Business.paid_until
+)
+WEBHOOK_BUSINESS_COLUMNS = (
+    Business.name, Business.business_type, Business.address,
+    Business.admin_email, Business.whatsapp_number, Business.flow_state,
+    Business.timezone, Business.is_active, Business.plan,
+    Business.chat_used, Business.chat_period, Business.chat_limit
+)
+
+BUSINESS_CACHE_TTL = 30  # seconds
+BUSINESS_CACHE_MAX = 5000  # in-process entries
+
+@dataclass(frozen=True)
+class BusinessSnapshot:
+    """Read-only subset of Business used for auth checks"""
+    id: int
+    name: str
+    admin_email: str
+    is_admin: bool
+    is_active: bool
+    timezone: str
+    whatsapp_number: Optional[str] = None
+
+# In-process fallback when Redis is not configured: bid -> (expires_at, snapshot)
+_business_cache: Dict[int, tuple] = {}
+
+async def get_business_snapshot(bid: int, db: Session) -> Optional[BusinessSnapshot]:
+    """Cached Business lookup for checks that don't need the ORM object"""
+    redis = getattr(app.state, "redis", None)
+    key = f"biz:{bid}"
+    
+    if redis:
+        try:
+            raw = await redis.get(key)
+            if raw:
+                return BusinessSnapshot(**orjson.loads(raw))
+        except Exception as e:
+            logger.warning(f"Business cache read failed: {str(e)}")
+    else:
+        entry = _business_cache.get(bid)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+    
+    # Routes are moving to AsyncSession one at a time; accept either kind
+    if isinstance(db, AsyncSession):
+        user = await db.get(Business, bid)
+    else:
+        user = db.get(Business, bid)
+    if not user:
+        return None
+    
+    snapshot = BusinessSnapshot(
+        id=user.id,
+        name=user.name,
+        admin_email=user.admin_email,
+        is_admin=bool(user.is_admin),
+        is_active=bool(user.is_active),
+        timezone=user.timezone,
+        whatsapp_number=user.whatsapp_number
+    )
+    
+    if redis:
+        try:
+            await redis.set(key, orjson.dumps(snapshot), ex=BUSINESS_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Business cache write failed: {str(e)}")
+    else:
+        # Oldest insertion goes first once the cap is hit
+        _business_cache.pop(bid, None)
+        if len(_business_cache) >= BUSINESS_CACHE_MAX:
+            del _business_cache[next(iter(_business_cache))]
+        _business_cache[bid] = (time.monotonic() + BUSINESS_CACHE_TTL, snapshot)
+    
+    return snapshot
+
+async def invalidate_business_cache(bid: int):
+    """Drop a cached snapshot after the Business row changes"""
+    _business_cache.pop(bid, None)
+    redis = getattr(app.state, "redis", None)
+    if redis:
+        try:
+            await redis.delete(f"biz:{bid}")
+        except Exception as e:
+            logger.warning(f"Business cache invalidation failed: {str(e)}")
+
+BUSINESS_LOOKUP_TTL = 300  # seconds
+BUSINESS_MISS_TTL = 60
+
+async def _lookup_business(
+    db: Session,
+    kind: str,
+    column,
+    value: str,
+    prefetched: bool = False,
+    cached: Optional[str] = None,
+    columns: tuple = ()
+) -> Optional[Business]:
+    """
+    Resolve a Business by a unique column through a Redis value -> id map.
+    Hits load the row by primary key; a row whose column no longer matches
+    (email/number changed) is treated as a miss, so stale entries self-heal.
+    Callers that already fetched biz:<kind>:<value> pass it as `cached`.
+    """
+    redis = getattr(app.state, "redis", None)
+    key = f"biz:{kind}:{value}"
+    options = [load_only(*columns)] if columns else []
+    
+    if redis:
+        if not prefetched:
+            try:
+                cached = await redis.get(key)
+            except Exception as e:
+                logger.warning(f"Business lookup cache read failed: {str(e)}")
+                cached = None
+        
+        if cached == "0":
+            return None
+        if cached:
+            user = db.get(Business, int(cached), options=options)
+            if user is not None and getattr(user, column.key) == value:
+                return user
+    
+    user = db.query(Business).options(*options).filter(column == value).first()
+    
+    if redis:
+        try:
+            if user:
+                await redis.set(key, str(user.id), ex=BUSINESS_LOOKUP_TTL)
+            else:
+                await redis.set(key, "0", ex=BUSINESS_MISS_TTL)
+        except Exception as e:
+            logger.warning(f"Business lookup cache write failed: {str(e)}")
+    
+    return user
+
+async def get_business_by_whatsapp(phone: str, db: Session) -> Optional[Business]:
+    """Business owning a (cleaned) WhatsApp number"""
+    return await _lookup_business(
+        db, "wa", Business.whatsapp_number, phone, columns=WEBHOOK_BUSINESS_COLUMNS
+    )
+
+async def invalidate_business_lookup(phone: str):
+    """Drop the cached lookup (incl. a cached miss) for a newly claimed number"""
+    redis = getattr(app.state, "redis", None)
+    if redis and phone:
+        try:
+            await redis.delete(f"biz:wa:{phone}")
+        except Exception as e:
+            logger.warning(f"Business lookup invalidation failed: {str(e)}")
 
 # =====================================================
 # ERROR HANDLERS
@@ -451,8 +1102,7 @@ async def not_found_handler(request: Request, exc):
 @app.exception_handler(500)
 async def internal_error_handler(request: Request, exc):
     """Custom 500 handler"""
-    logger.error(f"500 error: {str(exc)}")
-    logger.error(traceback.format_exc())
+    logger.error(f"500 error: {str(exc)}", exc_info=exc)
     return templates.TemplateResponse(
         "500.html",
         {"request": request},
@@ -462,7 +1112,7 @@ async def internal_error_handler(request: Request, exc):
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation errors"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={
             "error": "Validation error",
@@ -502,12 +1152,11 @@ async def health_check(request: Request, db: Session = Depends(get_db)):
     
     # Test Redis if configured
     redis_status = "not configured"
-    if settings.REDIS_URL:
+    redis = getattr(request.app.state, "redis", None)
+    if redis:
         try:
-            redis = await aioredis.from_url(settings.REDIS_URL)
             await redis.ping()
             redis_status = "healthy"
-            await redis.close()
         except Exception as e:
             redis_status = f"unhealthy: {str(e)}"
     
@@ -567,6 +1216,12 @@ async def login_page(request: Request):
         {"request": request, "error": error}
     )
 
+# Built once so every login reuses the same compiled statement; plain row,
+# no ORM identity-map work for the hottest unauthenticated route
+LOGIN_STMT = select(
+    Business.id, Business.admin_password, Business.is_active
+).where(Business.admin_email == bindparam("email"))
+
 @app.post("/login")
 @rate_limit(settings.RATE_LIMIT_LOGIN)
 async def login(
@@ -579,11 +1234,15 @@ async def login(
     """Login handler"""
     try:
         email = email.lower().strip()
-        user = db.query(Business).filter(Business.admin_email == email).first()
+        user = db.execute(LOGIN_STMT, {"email": email}).first()
         
-        if not user or not verify_password(password, user.admin_password):
+        # Hashing is tens of ms of CPU; keep it off the event loop. Unknown
+        # emails are checked against a dummy hash so both paths take the same time.
+        hashed = user.admin_password if user else dummy_password_hash()
+        valid, new_hash = await run_in_threadpool(verify_and_update_password, password, hashed)
+        
+        if not user or not valid:
             logger.warning(f"Failed login attempt for email: {email}")
-            await asyncio.sleep(1)  # Prevent timing attacks
             request.session["login_error"] = "Invalid email or password"
             return RedirectResponse("/login", 302)
         
@@ -592,13 +1251,17 @@ async def login(
             request.session["login_error"] = "Account is disabled. Please contact support."
             return RedirectResponse("/login", 302)
         
-        # Set session
+        # Set session (on a new id, so a pre-login id can't be fixated)
+        regenerate_session(request)
         request.session["business_id"] = user.id
         if remember:
             request.session["max_age"] = settings.SESSION_REMEMBER_AGE
         
-        # Update last login
-        user.last_login = datetime.utcnow()
+        # Update last login (and move legacy bcrypt hashes to argon2id)
+        values = {"last_login": datetime.utcnow()}
+        if new_hash:
+            values["admin_password"] = new_hash
+        db.execute(update(Business).where(Business.id == user.id).values(**values))
         db.commit()
         
         # Log audit
@@ -650,6 +1313,7 @@ async def signup_page(request: Request, plan: str = None):
 @rate_limit("5/minute")
 async def signup(
     request: Request,
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     phone: str = Form(...),
     email: str = Form(...),
@@ -675,12 +1339,15 @@ async def signup(
                 }
             )
         
-        # Check if user exists
-        existing = db.query(Business).filter(
-            (Business.admin_email == email) | (Business.whatsapp_number == phone)
-        ).first()
+        # Check if user exists: two unique-index probes in one round trip
+        # (an OR across both columns tends to plan as a BitmapOr / seq scan).
+        # The unique constraints + IntegrityError below remain authoritative.
+        email_taken, phone_taken = db.query(
+            exists().where(Business.admin_email == email),
+            exists().where(Business.whatsapp_number == phone)
+        ).one()
         
-        if existing:
+        if email_taken or phone_taken:
             return templates.TemplateResponse(
                 "signup.html",
                 {
@@ -691,38 +1358,41 @@ async def signup(
             )
         
         # Create user
+        now = datetime.utcnow()
         user = Business(
             name=name,
             whatsapp_number=phone,
             admin_email=email,
-            admin_password=hash_password(password),
+            admin_password=await run_in_threadpool(hash_password, password),
             business_type=business_type,
             plan="trial",
             is_active=True,
             chat_used=0,
             chat_limit=1000,
             onboarding_done=False,
-            created_at=datetime.utcnow(),
-            trial_ends_at=datetime.utcnow() + timedelta(days=7)
+            created_at=now,
+            trial_ends_at=now + timedelta(days=7)
         )
         
         db.add(user)
         db.commit()
+        await invalidate_business_lookup(phone)
+        await invalidate_admin_stats()
         
-        # Set session
+        # Set session (on a new id, so a pre-login id can't be fixated)
+        regenerate_session(request)
         request.session["business_id"] = user.id
         
         # Log audit
         log_audit(user.id, "signup", {"ip": request.client.host}, db)
         
-        # Send welcome email (async)
-        asyncio.create_task(
-            EmailService.send_email(
-                email,
-                "Welcome to BizFlow AI!",
-                "welcome",
-                {"name": name}
-            )
+        # Send welcome email after the response is on the wire
+        background_tasks.add_task(
+            EmailService.send_email,
+            email,
+            "Welcome to BizFlow AI!",
+            "welcome",
+            {"name": name}
         )
         
         logger.info(f"✅ New user signed up: {email}")
@@ -756,45 +1426,60 @@ async def signup(
 # DASHBOARD
 # =====================================================
 
+DASHBOARD_RECENT_BOOKINGS = 10
+
+# Recent bookings plus the business-wide totals as window counts: one
+# round trip, one prebuilt statement
+DASHBOARD_BOOKINGS_STMT = (
+    select(
+        *BOOKING_LIST_COLUMNS,
+        func.count().over().label("total_bookings"),
+        func.count().filter(Booking.status == "cancelled").over().label("cancelled_bookings")
+    )
+    .where(Booking.business_id == bindparam("bid"))
+    .order_by(Booking.created_at.desc())
+    .limit(DASHBOARD_RECENT_BOOKINGS)
+)
+
 @app.get("/dashboard", response_class=HTMLResponse)
 @login_required
 @rate_limit("30/minute")
 async def dashboard(request: Request, db: Session = Depends(get_db)):
     """User dashboard"""
     try:
-        user = get_user(request, db)
+        user = get_user(request, db, *DASHBOARD_BUSINESS_COLUMNS)
         if not user:
             request.session.clear()
             return RedirectResponse("/login", 302)
         
-        # Check trial expiry
-        if user.plan == "trial" and user.trial_ends_at and user.trial_ends_at < datetime.utcnow():
-            user.plan = "expired"
-            db.commit()
-        
-        # Get recent bookings
-        bookings = db.query(Booking)\
-            .filter(Booking.business_id == user.id)\
-            .order_by(Booking.created_at.desc())\
-            .limit(10)\
-            .all()
+        # Read the hot attributes once
+        now = datetime.utcnow()
+        plan, chat_limit = user.plan, user.chat_limit
+        chat_used = await chat_usage(user)
         
-        # Calculate analytics
-        total_bookings = db.query(Booking)\
-            .filter(Booking.business_id == user.id)\
-            .count()
+        # Check trial expiry
+        trial_days_left = 0
+        if plan == "trial" and user.trial_ends_at:
+            if user.trial_ends_at < now:
+                user.plan = "expired"
+                db.commit()
+            else:
+                trial_days_left = (user.trial_ends_at - now).days
         
-        cancelled = db.query(Booking)\
-            .filter(Booking.business_id == user.id, Booking.status == "cancelled")\
-            .count()
+        # Recent bookings and the booking totals in one query
+        bookings = db.execute(DASHBOARD_BOOKINGS_STMT, {"bid": user.id}).all()
+        if bookings:
+            total_bookings, cancelled = bookings[0].total_bookings, bookings[0].cancelled_bookings
+        else:
+            total_bookings = cancelled = 0
         
         analytics = {
-            "conversations": user.chat_used or 0,
+            "conversations": chat_used,
             "bookings": total_bookings,
             "interested": 0,
             "cancelled": cancelled,
-            "conversion": round((total_bookings / max(user.chat_used, 1)) * 100, 1) if user.chat_used else 0,
-            "chat_usage_percent": round((user.chat_used / user.chat_limit) * 100, 1) if user.chat_limit else 0
+            "conversion": round(total_bookings / chat_used * 100, 1) if chat_used else 0,
+            "chat_usage_percent": round(chat_used / chat_limit * 100, 1) if chat_limit else 0
         }
         
         return templates.TemplateResponse(
@@ -804,14 +1489,14 @@ async def dashboard(request: Request, db: Session = Depends(get_db)):
                 "business": user,
                 "bookings": bookings,
                 "analytics": analytics,
-                "now": datetime.utcnow(),
-                "trial_days_left": max((user.trial_ends_at - datetime.utcnow()).days, 0) if user.plan == "trial" and user.trial_ends_at else 0,
+                "chat_used": chat_used,
+                "now": now,
+                "trial_days_left": trial_days_left,
                 "plans": PLANS
             }
         )
     except Exception as e:
-        logger.error(f"Dashboard error for user {getattr(user, 'id', 'unknown')}: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Dashboard error for user {getattr(user, 'id', 'unknown')}: {str(e)}")
         return templates.TemplateResponse(
             "500.html",
             {"request": request, "error": "An error occurred loading your dashboard"},
@@ -876,7 +1561,7 @@ async def onboarding_complete(
 # =====================================================
 # PLANS CONFIGURATION
 # =====================================================
-PLANS = {
+_PLANS = {
     "starter": {
         "name": "Starter",
         "price": 999,
@@ -926,6 +1611,17 @@ PLANS = {
     }
 }
 
+# Built once and shared read-only by every request/template context
+PLANS = MappingProxyType({
+    key: MappingProxyType({**plan, "features": tuple(plan["features"])})
+    for key, plan in _PLANS.items()
+})
+
+# Razorpay works in paise; price table is fixed so this is frozen here
+PLAN_AMOUNT_PAISE = MappingProxyType({
+    key: int(plan["price"] * 100) for key, plan in _PLANS.items()
+})
+
 # =====================================================
 # WHATSAPP BOT ENGINE
 # =====================================================
@@ -933,21 +1629,45 @@ PLANS = {
 class WhatsAppBot:
     """Advanced WhatsApp bot with NLP capabilities"""
     
-    @staticmethod
-    def clean_phone(phone: str) -> str:
-        """Clean and format phone number"""
-        if not phone:
-            return ""
-        phone = re.sub(r'[^\d+]', '', phone.replace("whatsapp:", ""))
-        if len(phone) == 10:
-            phone = "91" + phone
-        return phone
+    # Compiled once at import instead of per inbound message
+    PHONE_STRIP_RE = re.compile(r'[^\d+]')
+    # ASCII fast path: delete every non-digit, non-'+' character in one C pass
+    # (also strips the "whatsapp:" prefix)
+    PHONE_STRIP_TABLE = str.maketrans('', '', ''.join(
+        c for c in map(chr, range(128)) if not (c.isdigit() or c == '+')
+    ))
     
-    @staticmethod
-    def get_industry_menu(business) -> str:
-        """Get dynamic menu based on industry"""
-        menus = {
-            "restaurant": """
+    # All booking formats in one alternation so the text is scanned once;
+    # the outer named group that matched (match.lastgroup) selects the branch
+    _BOOKING_TIME = r'(?P<{p}hour>\d{{1,2}})(?::(?P<{p}minute>\d{{2}}))?\s*(?P<{p}ampm>am|pm)?\s+(?P<{p}name>[a-z\s]+)'
+    
+    BOOKING_RE = re.compile('|'.join([
+        r'(?P<numeric>(?P<n_day>\d{1,2})[/-](?P<n_month>\d{1,2})\s+' + _BOOKING_TIME.format(p='n_') + ')',
+        r'(?P<monthname>(?P<m_day>\d{1,2})\s+(?P<m_month>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+' + _BOOKING_TIME.format(p='m_') + ')',
+        r'(?P<tomorrow>tomorrow\s+' + _BOOKING_TIME.format(p='tm_') + ')',
+        r'(?P<today>today\s+' + _BOOKING_TIME.format(p='td_') + ')',
+        r'(?P<weekday>next\s+(?P<w_day>monday|tuesday|wednesday|thursday|friday|saturday|sunday)\s+' + _BOOKING_TIME.format(p='w_') + ')'
+    ]))
+    
+    BOOKING_GROUP_PREFIX = {
+        'numeric': 'n_',
+        'monthname': 'm_',
+        'tomorrow': 'tm_',
+        'today': 'td_',
+        'weekday': 'w_'
+    }
+    
+    MONTHS = {
+        'jan': '01', 'feb': '02', 'mar': '03', 'apr': '04',
+        'may': '05', 'jun': '06', 'jul': '07', 'aug': '08',
+        'sep': '09', 'oct': '10', 'nov': '11', 'dec': '12'
+    }
+    
+    WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+    
+    # Menu templates by industry, built once; only {name} is filled per message
+    INDUSTRY_MENUS = {
+        "restaurant": """
 👋 Welcome to *{name}* 🍽️
 
 1️⃣ Book a Table
@@ -959,7 +1679,7 @@ class WhatsAppBot:
 
 Reply with number 👇
 """,
-            "clinic": """
+        "clinic": """
 👋 Welcome to *{name}* 🏥
 
 1️⃣ Book Appointment
@@ -971,7 +1691,7 @@ Reply with number 👇
 
 Reply with number 👇
 """,
-            "salon": """
+        "salon": """
 👋 Welcome to *{name}* 💇
 
 1️⃣ Book Appointment
@@ -983,7 +1703,7 @@ Reply with number 👇
 
 Reply with number 👇
 """,
-            "gym": """
+        "gym": """
 👋 Welcome to *{name}* 💪
 
 1️⃣ Book Session
@@ -995,7 +1715,7 @@ Reply with number 👇
 
 Reply with number 👇
 """,
-            "realestate": """
+        "realestate": """
 👋 Welcome to *{name}* 🏠
 
 1️⃣ Schedule Visit
@@ -1007,10 +1727,9 @@ Reply with number 👇
 
 Reply with number 👇
 """
-        }
-        
-        industry = business.business_type.lower()
-        menu = menus.get(industry, """
+    }
+    
+    DEFAULT_MENU = """
 👋 Welcome to *{name}* 🚀
 
 1️⃣ Book Appointment
@@ -1021,9 +1740,40 @@ Reply with number 👇
 6️⃣ Exit
 
 Reply with number 👇
-""")
-        
-        return menu.format(name=business.name)
+"""
+    
+    SERVICES = {
+        "restaurant": "🍽️ Our Services:\n• Dine-in\n• Takeaway\n• Delivery\n• Private Events\n• Catering",
+        "salon": "💇 Our Services:\n• Haircut & Styling\n• Coloring\n• Facial\n• Manicure/Pedicure\n• Massage",
+        "gym": "💪 Our Services:\n• Personal Training\n• Group Classes\n• Yoga\n• CrossFit\n• Nutrition Counseling",
+        "clinic": "🏥 Our Services:\n• General Consultation\n• Specialist Visit\n• Health Checkup\n• Vaccination\n• Lab Tests",
+    }
+    DEFAULT_SERVICES = "📋 Check our website for complete services."
+    
+    @staticmethod
+    def clean_phone(phone: str) -> str:
+        """Clean and format phone number"""
+        if not phone:
+            return ""
+        if phone.isascii():
+            phone = phone.translate(WhatsAppBot.PHONE_STRIP_TABLE)
+        else:
+            phone = WhatsAppBot.PHONE_STRIP_RE.sub('', phone)
+        if len(phone) == 10:
+            phone = "91" + phone
+        return phone
+    
+    @staticmethod
+    def get_industry_menu(business) -> str:
+        """Get dynamic menu based on industry"""
+        return WhatsAppBot._menu_for(business.business_type.lower(), business.name)
+    
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _menu_for(industry: str, name: str) -> str:
+        """Formatted menu per (industry, business name); only changes with those"""
+        menu = WhatsAppBot.INDUSTRY_MENUS.get(industry, WhatsAppBot.DEFAULT_MENU)
+        return menu.format_map({"name": name})
     
     @staticmethod
     def parse_booking(text: str) -> Optional[Dict]:
@@ -1031,57 +1781,45 @@ Reply with number 👇
         try:
             text = text.lower().strip()
             
-            # Common patterns
-            patterns = [
-                r'(\d{1,2})[/-](\d{1,2})\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s+([a-z\s]+)',
-                r'(\d{1,2})\s+(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s+([a-z\s]+)',
-                r'tomorrow\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s+([a-z\s]+)',
-                r'today\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s+([a-z\s]+)',
-                r'next\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s+([a-z\s]+)'
-            ]
+            match = WhatsAppBot.BOOKING_RE.search(text)
+            if not match:
+                return None
             
-            for pattern in patterns:
-                match = re.search(pattern, text)
-                if match:
-                    groups = match.groups()
-                    
-                    # Handle different patterns
-                    if len(groups) == 6:  # Full date pattern
-                        day, month, hour, minute, ampm, name = groups
-                        month_num = WhatsAppBot._month_to_number(month)
-                        date = f"{day.zfill(2)}-{month_num}-{datetime.now().year}"
-                    elif len(groups) == 4:  # Today/tomorrow pattern
-                        hour, minute, ampm, name = groups
-                        date = (datetime.now() + timedelta(days=1 if 'tomorrow' in text else 0)).strftime('%d-%m-%Y')
-                    elif len(groups) == 5:  # Next weekday pattern
-                        weekday, hour, minute, ampm, name = groups
-                        # Calculate next occurrence of weekday
-                        days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-                        target_day = days.index(weekday)
-                        current_day = datetime.now().weekday()
-                        days_ahead = target_day - current_day
-                        if days_ahead <= 0:
-                            days_ahead += 7
-                        date = (datetime.now() + timedelta(days=days_ahead)).strftime('%d-%m-%Y')
-                    else:
-                        continue
-                    
-                    # Format time
-                    hour = int(hour)
-                    if ampm and ampm.lower() == 'pm' and hour < 12:
-                        hour += 12
-                    elif ampm and ampm.lower() == 'am' and hour == 12:
-                        hour = 0
-                    
-                    time = f"{hour:02d}:{minute or '00'}"
-                    
-                    return {
-                        "date": date,
-                        "time": time,
-                        "name": name.strip().title()
-                    }
+            kind = match.lastgroup
+            p = WhatsAppBot.BOOKING_GROUP_PREFIX[kind]
+            hour, minute, ampm, name = match.group(p + 'hour', p + 'minute', p + 'ampm', p + 'name')
             
-            return None
+            # Handle different patterns
+            if kind == 'numeric':
+                date = f"{match.group('n_day').zfill(2)}-{match.group('n_month').zfill(2)}-{datetime.now().year}"
+            elif kind == 'monthname':
+                month_num = WhatsAppBot._month_to_number(match.group('m_month'))
+                date = f"{match.group('m_day').zfill(2)}-{month_num}-{datetime.now().year}"
+            elif kind in ('today', 'tomorrow'):
+                date = (datetime.now() + timedelta(days=1 if kind == 'tomorrow' else 0)).strftime('%d-%m-%Y')
+            else:  # Next weekday pattern
+                # Calculate next occurrence of weekday
+                target_day = WhatsAppBot.WEEKDAYS.index(match.group('w_day'))
+                now = datetime.now()
+                days_ahead = target_day - now.weekday()
+                if days_ahead <= 0:
+                    days_ahead += 7
+                date = (now + timedelta(days=days_ahead)).strftime('%d-%m-%Y')
+            
+            # Format time
+            hour = int(hour)
+            if ampm and ampm.lower() == 'pm' and hour < 12:
+                hour += 12
+            elif ampm and ampm.lower() == 'am' and hour == 12:
+                hour = 0
+            
+            time = f"{hour:02d}:{minute or '00'}"
+            
+            return {
+                "date": date,
+                "time": time,
+                "name": name.strip().title()
+            }
             
         except Exception as e:
             logger.error(f"Booking parse error: {str(e)}")
@@ -1090,16 +1828,21 @@ Reply with number 👇
     @staticmethod
     def _month_to_number(month: str) -> str:
         """Convert month name to number"""
-        months = {
-            'jan': '01', 'feb': '02', 'mar': '03', 'apr': '04',
-            'may': '05', 'jun': '06', 'jul': '07', 'aug': '08',
-            'sep': '09', 'oct': '10', 'nov': '11', 'dec': '12'
-        }
-        return months.get(month[:3].lower(), '01')
+        return WhatsAppBot.MONTHS.get(month[:3].lower(), '01')
+    
+    @staticmethod
+    def _set_state(business, state: str):
+        """Assign flow_state only when it changes, so idempotent taps stay clean"""
+        if business.flow_state != state:
+            business.flow_state = state
     
     @staticmethod
     def process_message(phone: str, message: str, business, db) -> str:
-        """Process incoming WhatsApp message"""
+        """
+        Process incoming WhatsApp message.
+        State changes are left pending; the webhook commits once per message
+        (and not at all when nothing changed).
+        """
         message = message.strip()
         lower_msg = message.lower()
         
@@ -1107,8 +1850,7 @@ Reply with number 👇
         
         # Reset command
         if lower_msg in ["reset", "restart", "help", "menu"]:
-            business.flow_state = "menu"
-            db.commit()
+            WhatsAppBot._set_state(business, "menu")
             return WhatsAppBot.get_industry_menu(business)
         
         # Handle based on state
@@ -1117,8 +1859,7 @@ Reply with number 👇
         elif state == "booking":
             return WhatsAppBot._handle_booking(message, phone, business, db)
         else:
-            business.flow_state = "menu"
-            db.commit()
+            WhatsAppBot._set_state(business, "menu")
             return WhatsAppBot.get_industry_menu(business)
     
     @staticmethod
@@ -1135,8 +1876,7 @@ Reply with number 👇
         
         if message in options:
             if options[message] == 'booking':
-                business.flow_state = "booking"
-                db.commit()
+                WhatsAppBot._set_state(business, "booking")
                 return (
                     "📅 Please provide booking details:\n\n"
                     "Examples:\n"
@@ -1155,8 +1895,7 @@ Reply with number 👇
             elif options[message] == 'pricing':
                 return WhatsAppBot._get_pricing(business)
             elif options[message] == 'exit':
-                business.flow_state = "start"
-                db.commit()
+                WhatsAppBot._set_state(business, "start")
                 return "👋 Thank you for visiting! Type 'hi' to start again."
         
         return "❌ Invalid option. Please reply with a number (1-6)."
@@ -1165,8 +1904,7 @@ Reply with number 👇
     def _handle_booking(message: str, phone: str, business, db) -> str:
         """Handle booking process"""
         if message.lower() in ['cancel', 'back', 'exit']:
-            business.flow_state = "menu"
-            db.commit()
+            WhatsAppBot._set_state(business, "menu")
             return "❌ Booking cancelled.\n\n" + WhatsAppBot.get_industry_menu(business)
         
         booking_data = WhatsAppBot.parse_booking(message)
@@ -1195,6 +1933,11 @@ Reply with number 👇
 Please choose another time.
 """
         
+        # Resolve the slot to UTC once so reminders can filter on it in SQL
+        booking_dt = booking_datetime_utc(
+            booking_data['date'], booking_data['time'], business.timezone
+        )
+        
         # Create booking
         booking = Booking(
             business_id=business.id,
@@ -1202,12 +1945,11 @@ Please choose another time.
             phone=phone,
             booking_date=booking_data['date'],
             booking_time=booking_data['time'],
+            booking_datetime_utc=booking_dt,
             status='pending'
         )
         db.add(booking)
-        business.flow_state = "menu"
-        business.chat_used = (business.chat_used or 0) + 1
-        db.commit()
+        WhatsAppBot._set_state(business, "menu")
         
         return f"""
 ✅ Booking Confirmed!
@@ -1224,18 +1966,16 @@ Type 'menu' for main menu 👋
     @staticmethod
     def _get_services(business) -> str:
         """Get services based on industry"""
-        services = {
-            "restaurant": "🍽️ Our Services:\n• Dine-in\n• Takeaway\n• Delivery\n• Private Events\n• Catering",
-            "salon": "💇 Our Services:\n• Haircut & Styling\n• Coloring\n• Facial\n• Manicure/Pedicure\n• Massage",
-            "gym": "💪 Our Services:\n• Personal Training\n• Group Classes\n• Yoga\n• CrossFit\n• Nutrition Counseling",
-            "clinic": "🏥 Our Services:\n• General Consultation\n• Specialist Visit\n• Health Checkup\n• Vaccination\n• Lab Tests",
-        }
-        return services.get(business.business_type.lower(), "📋 Check our website for complete services.")
+        return WhatsAppBot.SERVICES.get(business.business_type.lower(), WhatsAppBot.DEFAULT_SERVICES)
     
     @staticmethod
     def _get_location(business) -> str:
         """Get business location"""
-        addr = business.address or "Main Location"
+        return WhatsAppBot._location_for(business.address or "Main Location")
+    
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _location_for(addr: str) -> str:
         return f"""
 📍 {addr}
 
@@ -1259,7 +1999,9 @@ For urgent inquiries, please call during business hours.
     @staticmethod
     def _get_pricing(business) -> str:
         """Get pricing information"""
-        return """
+        return WhatsAppBot.PRICING_TEXT
+    
+    PRICING_TEXT = """
 💰 Pricing:
 
 Basic consultation: ₹500
@@ -1272,8 +2014,174 @@ Check our website for detailed pricing and packages.
 # WHATSAPP WEBHOOK
 # =====================================================
 
+TWIML_MESSAGE = b'<?xml version="1.0" encoding="UTF-8"?><Response><Message>%s</Message></Response>'
+TWIML_EMPTY = b'<?xml version="1.0" encoding="UTF-8"?><Response />'
+
+def twiml_response(*messages: str, status_code: int = 200) -> Response:
+    """TwiML reply; the single-message case skips building an XML tree"""
+    if not messages:
+        content = TWIML_EMPTY
+    elif len(messages) == 1:
+        content = TWIML_MESSAGE % xml_escape(messages[0]).encode()
+    else:
+        resp = MessagingResponse()
+        for message in messages:
+            resp.message(message)
+        content = str(resp)
+    
+    return Response(
+        content=content,
+        media_type="application/xml",
+        status_code=status_code
+    )
+
+CHAT_SYNC_EVERY = 20  # mirror the Redis counter into Business.chat_used every N chats
+
+def _next_month_start(now: datetime) -> datetime:
+    """First instant of the month after `now`"""
+    return (now.replace(day=1) + timedelta(days=32)).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+def stored_chat_used(business: Business, period: str) -> int:
+    """Business.chat_used for `period` (a count left from an earlier month is 0)"""
+    return business.chat_used if business.chat_period == period else 0
+
+async def chat_usage(business: Business) -> int:
+    """Chats used this month, from the live Redis counter when there is one"""
+    period = f"{datetime.utcnow():%Y%m}"
+    redis = getattr(app.state, "redis", None)
+    if redis:
+        try:
+            used = await redis.get(f"chat:{business.id}:{period}")
+            if used is not None:
+                return int(used)
+        except Exception as e:
+            logger.warning(f"Chat quota counter unavailable, using DB: {str(e)}")
+    return stored_chat_used(business, period)
+
+async def consume_chat_quota(business: Business, db: Session) -> bool:
+    """
+    Count one inbound chat against the plan's monthly limit.
+    Returns False once the limit is exhausted. With Redis this is a
+    fixed-window INCR on chat:<id>:<yyyymm> that expires after month end,
+    seeded from the DB count so a flushed Redis doesn't hand out a fresh
+    quota; Business.chat_used is only written every CHAT_SYNC_EVERY chats.
+    Without Redis a single conditional UPDATE checks and counts.
+    """
+    limit = business.chat_limit
+    now = datetime.utcnow()
+    period = f"{now:%Y%m}"
+    redis = getattr(app.state, "redis", None)
+    
+    if redis:
+        key = f"chat:{business.id}:{period}"
+        ttl = int((_next_month_start(now) + timedelta(days=1) - now).total_seconds())
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, stored_chat_used(business, period), ex=ttl, nx=True)
+                pipe.incr(key)
+                _, used = await pipe.execute()
+            
+            if used % CHAT_SYNC_EVERY == 0 or used == limit:
+                db.query(Business).filter(Business.id == business.id).update(
+                    {Business.chat_used: used, Business.chat_period: period},
+                    synchronize_session=False
+                )
+                db.info["bulk_writes"] = True
+            return used <= limit
+        except Exception as e:
+            logger.warning(f"Chat quota counter unavailable, using DB: {str(e)}")
+    
+    # Check and increment in one statement; the month's first chat restarts the count
+    counted = db.query(Business).filter(
+        Business.id == business.id,
+        or_(
+            Business.chat_period.is_distinct_from(period),
+            Business.chat_used < Business.chat_limit
+        )
+    ).update(
+        {
+            Business.chat_used: case(
+                (Business.chat_period == period, Business.chat_used + 1),
+                else_=1
+            ),
+            Business.chat_period: period
+        },
+        synchronize_session=False
+    )
+    db.info["bulk_writes"] = True
+    return counted == 1
+
+WEBHOOK_RATE_LIMIT = 20  # messages per sender per minute
+WEBHOOK_RATE_WINDOW = 60  # seconds
+WEBHOOK_RATE_MAX_SENDERS = 10_000
+
+# In-process fallback when Redis is unavailable: sender -> recent hit times,
+# least recently seen sender first so the map can be capped
+_webhook_hits: "OrderedDict[str, deque]" = OrderedDict()
+
+def local_webhook_allowed(phone: str) -> bool:
+    """Sliding-window check for one sender; only that sender's entries are touched"""
+    now = time.monotonic()
+    hits = _webhook_hits.get(phone)
+    if hits is None:
+        hits = _webhook_hits[phone] = deque(maxlen=WEBHOOK_RATE_LIMIT)
+        if len(_webhook_hits) > WEBHOOK_RATE_MAX_SENDERS:
+            _webhook_hits.popitem(last=False)
+    else:
+        _webhook_hits.move_to_end(phone)
+    
+    while hits and now - hits[0] >= WEBHOOK_RATE_WINDOW:
+        hits.popleft()
+    if len(hits) >= WEBHOOK_RATE_LIMIT:
+        return False
+    hits.append(now)
+    return True
+
+async def sweep_webhook_hits():
+    """Every window, forget senders with no hits left inside it"""
+    while True:
+        await asyncio.sleep(WEBHOOK_RATE_WINDOW)
+        cutoff = time.monotonic() - WEBHOOK_RATE_WINDOW
+        for phone in [p for p, hits in _webhook_hits.items() if not hits or hits[-1] <= cutoff]:
+            del _webhook_hits[phone]
+
+async def resolve_webhook_sender(phone: str, db: Session) -> tuple:
+    """
+    Per-sender rate limit and Business lookup in one Redis round trip.
+    Returns (business, allowed). slowapi keys on the client address, which
+    for webhooks is Twilio's, so the window is keyed on the sender instead.
+    """
+    redis = getattr(app.state, "redis", None)
+    if not redis:
+        if not local_webhook_allowed(phone):
+            return None, False
+        return await get_business_by_whatsapp(phone, db), True
+    
+    rate_key = f"rl:wa:{phone}:{int(time.time() // WEBHOOK_RATE_WINDOW)}"
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.incr(rate_key)
+            pipe.expire(rate_key, WEBHOOK_RATE_WINDOW)
+            pipe.get(f"biz:wa:{phone}")
+            hits, _, cached = await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Webhook Redis pipeline failed: {str(e)}")
+        if not local_webhook_allowed(phone):
+            return None, False
+        return await get_business_by_whatsapp(phone, db), True
+    
+    if hits > WEBHOOK_RATE_LIMIT:
+        return None, False
+    
+    business = await _lookup_business(
+        db, "wa", Business.whatsapp_number, phone,
+        prefetched=True, cached=cached, columns=WEBHOOK_BUSINESS_COLUMNS
+    )
+    return business, True
+
 @app.post("/webhook/whatsapp")
-@rate_limit("60/minute")
 async def whatsapp_webhook(request: Request, db: Session = Depends(get_db)):
     """WhatsApp webhook handler"""
     try:
@@ -1285,9 +2193,11 @@ async def whatsapp_webhook(request: Request, db: Session = Depends(get_db)):
         logger.info(f"📱 WhatsApp | {phone} | {message}")
         
         # Find business by phone number
-        business = db.query(Business)\
-            .filter(Business.whatsapp_number == phone)\
-            .first()
+        business, allowed = await resolve_webhook_sender(phone, db)
+        
+        if not allowed:
+            logger.warning(f"WhatsApp rate limit exceeded for {phone}")
+            return twiml_response()
         
         if not business:
             reply = (
@@ -1299,36 +2209,33 @@ async def whatsapp_webhook(request: Request, db: Session = Depends(get_db)):
             )
         else:
             # Check if business is active and within limits
+            plan, limit = business.plan, business.chat_limit
             if not business.is_active:
                 reply = "❌ This business account is currently inactive. Please contact support."
-            elif business.chat_used >= business.chat_limit:
+            elif not await consume_chat_quota(business, db):
                 reply = (
                     "❌ Monthly chat limit reached.\n\n"
-                    f"Your plan: {business.plan.upper()}\n"
-                    f"Limit: {business.chat_limit} chats/month\n\n"
+                    f"Your plan: {plan.upper()}\n"
+                    f"Limit: {limit} chats/month\n\n"
                     "Please upgrade your plan to continue."
                 )
             else:
-                # Process message
+                # Process message; state changes are committed once below
                 reply = WhatsAppBot.process_message(phone, message, business, db)
+            
+            # Skip the COMMIT round trip when the message changed nothing
+            # (Query.update() writes don't show up in db.dirty, hence the flag)
+            if db.new or db.dirty or db.info.pop("bulk_writes", False):
+                db.commit()
         
         # Twilio response
-        resp = MessagingResponse()
-        resp.message(reply)
-        
-        return Response(
-            content=str(resp),
-            media_type="application/xml"
-        )
+        return twiml_response(reply)
         
     except Exception as e:
-        logger.error(f"WhatsApp webhook error: {str(e)}")
-        logger.error(traceback.format_exc())
-        resp = MessagingResponse()
-        resp.message("❌ An error occurred. Please try again later.")
-        return Response(
-            content=str(resp),
-            media_type="application/xml",
+        db.rollback()
+        logger.exception(f"WhatsApp webhook error: {str(e)}")
+        return twiml_response(
+            "❌ An error occurred. Please try again later.",
             status_code=500
         )
 
@@ -1336,20 +2243,24 @@ async def whatsapp_webhook(request: Request, db: Session = Depends(get_db)):
 # PAYMENT ROUTES
 # =====================================================
 
+BILLING_HISTORY_LIMIT = 50
+
 @app.get("/billing", response_class=HTMLResponse)
 @login_required
-async def billing_page(request: Request, db: Session = Depends(get_db)):
+async def billing_page(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Billing and subscription page"""
     try:
-        user = get_user(request, db)
+        user = await get_user_async(request, db)
         if not user:
             return RedirectResponse("/login", 302)
         
-        # Get payment history
-        payments = db.query(Payment)\
-            .filter(Payment.business_id == user.id)\
-            .order_by(Payment.created_at.desc())\
-            .all()
+        # Most recent payments only (walks ix_payment_business_created backwards)
+        payments = (await db.execute(
+            select(Payment)
+            .where(Payment.business_id == user.id)
+            .order_by(Payment.created_at.desc())
+            .limit(BILLING_HISTORY_LIMIT)
+        )).scalars().all()
         
         return templates.TemplateResponse(
             "billing.html",
@@ -1357,14 +2268,14 @@ async def billing_page(request: Request, db: Session = Depends(get_db)):
                 "request": request,
                 "business": user,
                 "payments": payments,
+                "chat_used": await chat_usage(user),
                 "razorpay_key": settings.RAZORPAY_KEY,
                 "plans": PLANS,
                 "current_plan": user.plan
             }
         )
     except Exception as e:
-        logger.error(f"Billing page error: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Billing page error: {str(e)}")
         return templates.TemplateResponse(
             "500.html",
             {"request": request, "error": "An error occurred loading the billing page"},
@@ -1374,19 +2285,20 @@ async def billing_page(request: Request, db: Session = Depends(get_db)):
 @app.post("/api/create-order")
 @login_required
 @rate_limit("10/minute")
-async def create_order(request: Request, db: Session = Depends(get_db)):
+async def create_order(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Create Razorpay order"""
     try:
         if not razorpay_client:
             logger.error("Razorpay client not initialized")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=503,
                 content={"error": "Payment service temporarily unavailable"}
             )
         
-        user = get_user(request, db)
+        # Cached snapshot: the order only needs id, name and contact details
+        user = await get_business_snapshot(request.session["business_id"], db)
         if not user:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=401,
                 content={"error": "Authentication required"}
             )
@@ -1395,18 +2307,18 @@ async def create_order(request: Request, db: Session = Depends(get_db)):
         plan = data.get("plan")
         
         if plan not in PLANS:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={"error": "Invalid plan selected"}
             )
         
-        amount = PLANS[plan]["price"] * 100  # Convert to paise
+        amount = PLAN_AMOUNT_PAISE[plan]
         
-        # Create Razorpay order
-        order = razorpay_client.order.create({
+        # Create Razorpay order (sync SDK -> threadpool)
+        order = await run_in_threadpool(razorpay_client.order.create, {
             "amount": amount,
             "currency": "INR",
-            "receipt": f"order_{user.id}_{int(datetime.utcnow().timestamp())}",
+            "receipt": f"order_{user.id}_{int(time.time())}",
             "payment_capture": 1,
             "notes": {
                 "business_id": str(user.id),
@@ -1415,6 +2327,19 @@ async def create_order(request: Request, db: Session = Depends(get_db)):
             }
         })
         
+        # Remember what was ordered so payment_success needn't fetch it back.
+        # payment_id is unknown until checkout; the order id holds its place.
+        db.add(Payment(
+            business_id=user.id,
+            payment_id=order["id"],
+            order_id=order["id"],
+            amount=amount / 100,
+            currency="INR",
+            status="pending",
+            plan=plan
+        ))
+        await db.commit()
+        
         logger.info(f"✅ Order created: {order['id']} for user {user.id}")
         
         return {
@@ -1430,100 +2355,121 @@ async def create_order(request: Request, db: Session = Depends(get_db)):
         
     except razorpay.errors.BadRequestError as e:
         logger.error(f"Razorpay error: {str(e)}")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={"error": "Payment service error. Please try again."}
         )
     except Exception as e:
-        logger.error(f"Order creation error: {str(e)}")
-        logger.error(traceback.format_exc())
-        return JSONResponse(
+        logger.exception(f"Order creation error: {str(e)}")
+        return ORJSONResponse(
             status_code=500,
             content={"error": "Failed to create order. Please try again."}
         )
 
+def activate_plan(user: Business, plan: str):
+    """Apply a paid plan for the next 30 days (caller commits)"""
+    user.plan = plan
+    user.chat_limit = PLANS[plan]["chats"]
+    user.paid_until = datetime.utcnow() + timedelta(days=30)
+
+# A failed attempt doesn't close a Razorpay order: the customer can retry and pay it
+SETTLEABLE_PAYMENT_STATUSES = ("pending", "failed")
+
+async def settle_payment(db: AsyncSession, payment: Payment, user: Business, **values) -> bool:
+    """
+    Mark an order paid and activate its plan, unless the other path (checkout
+    callback or webhook) already did. The conditional UPDATE is the claim:
+    concurrent callers queue on the row lock and only the first one matches.
+    The caller commits, then calls confirm_payment() only if this returned True.
+    """
+    claimed = await db.execute(
+        update(Payment)
+        .where(Payment.id == payment.id, Payment.status.in_(SETTLEABLE_PAYMENT_STATUSES))
+        .values(status="success", **values)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        return False
+    activate_plan(user, payment.plan)
+    return True
+
+def confirm_payment(user: Business, payment: Payment, payment_id: str, source: str):
+    """Audit entry and confirmation email for a settled order (sent once, after commit)"""
+    log_audit(user.id, "payment", {
+        "plan": payment.plan,
+        "amount": payment.amount,
+        "payment_id": payment_id,
+        "source": source
+    })
+    
+    logger.info(f"✅ Payment success via {source}: {payment_id} | User: {user.id} | Plan: {payment.plan}")
+    
+    # Send confirmation email (background senders)
+    EmailService.enqueue(
+        user.admin_email,
+        "Payment Successful!",
+        "payment_success",
+        {
+            "plan": payment.plan.upper(),
+            "amount": payment.amount,
+            "payment_id": payment_id,
+            "valid_until": user.paid_until.strftime('%d %B %Y')
+        }
+    )
+
 @app.post("/api/payment-success")
 @login_required
-async def payment_success(request: Request, db: Session = Depends(get_db)):
+async def payment_success(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Handle successful payment"""
     try:
         if not razorpay_client:
             logger.error("Razorpay client not initialized")
             return {"status": "error", "message": "Payment service unavailable"}
         
-        user = get_user(request, db)
+        user = await get_user_async(request, db)
         if not user:
             return {"status": "error", "message": "User not authenticated"}
         
         data = await request.json()
         
         # Verify signature
-        razorpay_client.utility.verify_payment_signature(data)
+        verify_checkout_signature(data)
         
         # Get payment details
         payment_id = data.get('razorpay_payment_id')
         order_id = data.get('razorpay_order_id')
         
-        # Fetch order details
-        order = razorpay_client.order.fetch(order_id)
-        amount_paid = order['amount']
-        notes = order.get('notes', {})
-        plan = notes.get('plan', 'pro')
-        
-        # Determine plan from amount if not in notes
-        if plan not in PLANS:
-            if amount_paid == PLANS["starter"]["price"] * 100:
-                plan = "starter"
-            else:
-                plan = "pro"
+        # Plan and amount were stored with the order in create_order
+        payment = (await db.execute(
+            select(Payment).where(
+                Payment.order_id == order_id,
+                Payment.business_id == user.id
+            )
+        )).scalar_one_or_none()
+        if not payment:
+            logger.error(f"Payment success for unknown order {order_id}")
+            return {"status": "error", "message": "Order not found"}
         
-        # Record payment
-        payment = Payment(
-            business_id=user.id,
+        settled = await settle_payment(
+            db, payment, user,
             payment_id=payment_id,
-            order_id=order_id,
-            amount=amount_paid / 100,
-            currency="INR",
-            status="success",
-            plan=plan,
+            signature=data.get('razorpay_signature'),
             payment_data=data
         )
-        db.add(payment)
+        await db.commit()
         
-        # Upgrade user plan
-        old_plan = user.plan
-        user.plan = plan
-        user.chat_limit = PLANS[plan]["chats"]
-        user.paid_until = datetime.utcnow() + timedelta(days=30)
-        db.commit()
-        
-        # Log audit
-        log_audit(user.id, "payment", {
-            "plan": plan,
-            "amount": amount_paid / 100,
-            "payment_id": payment_id
-        }, db)
-        
-        logger.info(f"✅ Payment success: {payment_id} | User: {user.id} | Plan: {plan}")
-        
-        # Send confirmation email (async)
-        asyncio.create_task(
-            EmailService.send_email(
-                user.admin_email,
-                "Payment Successful!",
-                "payment_success",
-                {
-                    "plan": plan.upper(),
-                    "amount": amount_paid / 100,
-                    "payment_id": payment_id,
-                    "valid_until": user.paid_until.strftime('%d %B %Y')
-                }
-            )
-        )
+        if settled:
+            await invalidate_admin_stats()
+            confirm_payment(user, payment, payment_id, "checkout")
+        else:
+            # Usually the webhook got there first: the payment still went through
+            status = await db.scalar(select(Payment.status).where(Payment.id == payment.id))
+            if status != "success":
+                return {"status": "error", "message": "Payment already processed"}
         
         return {
             "status": "success",
-            "plan": plan,
+            "plan": payment.plan,
             "message": "Your plan has been upgraded successfully!"
         }
         
@@ -1531,111 +2477,284 @@ async def payment_success(request: Request, db: Session = Depends(get_db)):
         logger.error(f"Payment signature verification failed")
         return {"status": "error", "message": "Payment verification failed"}
     except Exception as e:
-        logger.error(f"Payment success error: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Payment success error: {str(e)}")
         return {"status": "error", "message": "An error occurred processing your payment"}
 
 @app.post("/api/razorpay-webhook")
 async def razorpay_webhook(request: Request):
-    """Razorpay webhook handler for async events"""
+    """
+    Razorpay webhook handler. The event is acknowledged only once it is
+    committed; any failure answers non-2xx so Razorpay retries it.
+    """
     if not settings.RAZORPAY_WEBHOOK_SECRET:
         return {"status": "webhook disabled"}
     
     try:
         # Verify webhook signature
         body = await request.body()
-        signature = request.headers.get("x-razorpay-signature")
+        signature = request.headers.get("x-razorpay-signature", "")
         
-        expected_signature = hmac.new(
-            key=settings.RAZORPAY_WEBHOOK_SECRET.encode(),
-            msg=body,
-            digestmod=hashlib.sha256
-        ).hexdigest()
+        # Single-shot C HMAC (OpenSSL) instead of hmac.new().hexdigest()
+        expected_signature = hmac.digest(RAZORPAY_WEBHOOK_KEY, body, "sha256").hex()
         
         if not hmac.compare_digest(signature, expected_signature):
             logger.error("Invalid webhook signature")
-            return JSONResponse(status_code=400, content={"error": "Invalid signature"})
+            return ORJSONResponse(status_code=400, content={"error": "Invalid signature"})
         
         # Parse webhook
-        data = json.loads(body)
+        data = orjson.loads(body)
         event = data.get("event")
         
         logger.info(f"📡 Razorpay webhook: {event}")
         
-        # Handle different events asynchronously
-        asyncio.create_task(handle_razorpay_webhook_event(data))
+        # Join the next batch and wait for its commit; 503 makes Razorpay retry later
+        done = asyncio.get_running_loop().create_future()
+        try:
+            request.app.state.razorpay_queue.put_nowait((data, done))
+        except asyncio.QueueFull:
+            logger.error(f"Razorpay webhook queue full, rejecting {event}")
+            return ORJSONResponse(status_code=503, content={"error": "Busy, retry later"})
         
-        return {"status": "received"}
+        try:
+            await done
+        except Exception as e:
+            logger.error(f"Razorpay webhook {event} not processed, asking for a retry: {str(e)}")
+            return ORJSONResponse(status_code=500, content={"error": "Processing failed, retry later"})
+        
+        return {"status": "processed"}
         
     except Exception as e:
         logger.error(f"Webhook error: {str(e)}")
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
+
+WEBHOOK_QUEUE_SIZE = 10_000
+WEBHOOK_BATCH_SIZE = 128
+
+async def razorpay_webhook_drainer(queue: asyncio.Queue):
+    """Take up to WEBHOOK_BATCH_SIZE queued events at a time; None stops the loop"""
+    stop = False
+    while not stop:
+        batch = [await queue.get()]
+        while len(batch) < WEBHOOK_BATCH_SIZE and not queue.empty():
+            batch.append(queue.get_nowait())
+        
+        if None in batch:
+            stop = True
+            batch = [item for item in batch if item is not None]
+        
+        if batch:
+            await process_razorpay_events(batch)
+
+def _resolve_webhook(future: asyncio.Future, error: Exception = None):
+    # The waiting request may have gone away (client disconnect)
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+async def process_razorpay_events(batch: list):
+    """
+    Handle a batch of (event, future) pairs inside one DB transaction. Each
+    future resolves after COMMIT, or with the error that kept its event (or
+    the whole batch) from being stored, so the webhook can ask for a retry.
+    """
+    failed = {}
+    settled = []
+    try:
+        async with AsyncSessionLocal() as db:
+            async with db.begin():
+                for i, (data, _) in enumerate(batch):
+                    # Savepoint per event: a failing event rolls back only its own writes
+                    try:
+                        async with db.begin_nested():
+                            result = await handle_razorpay_webhook_event(data, db)
+                        if result:
+                            settled.append(result)
+                    except Exception as e:
+                        logger.error(f"Razorpay event {data.get('event')} failed: {str(e)}")
+                        failed[i] = e
+    except Exception as e:
+        logger.error(f"Razorpay batch of {len(batch)} events failed: {str(e)}")
+        for _, future in batch:
+            _resolve_webhook(future, e)
+        return
+    
+    for i, (_, future) in enumerate(batch):
+        _resolve_webhook(future, failed.get(i))
+    
+    if settled:
+        await invalidate_admin_stats()
+        for user, payment, payment_id in settled:
+            confirm_payment(user, payment, payment_id, "webhook")
 
-async def handle_razorpay_webhook_event(data: dict):
-    """Handle razorpay webhook events asynchronously"""
+async def handle_razorpay_webhook_event(data: dict, db: AsyncSession) -> Optional[tuple]:
+    """
+    Handle one razorpay webhook event (writes join the batch transaction).
+    Settles orders whose checkout callback never reached /api/payment-success,
+    e.g. the browser closed after paying. Returns (user, payment, payment_id)
+    when this event settled the order, for the post-commit confirmation.
+    """
     event = data.get("event")
-    payload = data.get("payload", {})
+    entity = data.get("payload", {}).get("payment", {}).get("entity", {})
     
-    if event == "payment.failed":
-        payment_id = payload.get("payment", {}).get("entity", {}).get("id")
-        logger.warning(f"Payment failed: {payment_id}")
-        # Handle failed payment (e.g., notify user)
+    if event not in ("payment.captured", "payment.failed"):
+        logger.info(f"Ignoring razorpay event {event}")
+        return None
     
-    elif event == "subscription.charged":
-        # Handle recurring payment success
-        pass
+    payment = (await db.execute(
+        select(Payment).where(Payment.order_id == entity.get("order_id"))
+    )).scalar_one_or_none()
+    if not payment:
+        logger.warning(f"Razorpay {event} for unknown order {entity.get('order_id')}")
+        return None
     
-    elif event == "subscription.paused":
-        # Handle subscription paused
-        pass
+    if event == "payment.failed":
+        # Only an open order records the failed attempt; a paid one stays paid
+        await db.execute(
+            update(Payment)
+            .where(Payment.id == payment.id, Payment.status == "pending")
+            .values(status="failed", payment_method=entity.get("method"), payment_data=entity)
+            .execution_options(synchronize_session=False)
+        )
+        logger.warning(f"Payment failed: {entity.get('id')} for order {payment.order_id}")
+        return None
+    
+    user = await db.get(Business, payment.business_id)
+    settled = await settle_payment(
+        db, payment, user,
+        payment_id=entity.get("id"),
+        payment_method=entity.get("method"),
+        payment_data=entity
+    )
+    # Not settled: the checkout callback already did it
+    return (user, payment, entity.get("id")) if settled else None
 
 # =====================================================
 # ADMIN ROUTES
 # =====================================================
 
+ADMIN_STATS_TTL = 60  # seconds; the counters move at human timescales
+ADMIN_STATS_KEY = "admin:stats:v1"
+
+# In-process fallback when Redis is not configured: key -> (expires_at, stats)
+_admin_stats_cache: Dict[str, tuple] = {}
+
+async def compute_admin_stats(db: AsyncSession) -> dict:
+    """Site-wide counters for the admin dashboard (three aggregate queries)"""
+    # All user counters in one pass over businesses
+    total_users, active_users, admin_users, pro_users, trial_users, enterprise_users = (
+        await db.execute(select(
+            func.count(Business.id),
+            func.count().filter(Business.is_active.is_(True)),
+            func.count().filter(Business.is_admin.is_(True)),
+            func.count().filter(Business.plan == "pro"),
+            func.count().filter(Business.plan == "trial"),
+            func.count().filter(Business.plan == "enterprise")
+        ))
+    ).one()
+    
+    total_revenue = await db.scalar(
+        select(func.coalesce(func.sum(Payment.amount), 0))
+        .where(Payment.status == "success")
+    )
+    total_bookings = await db.scalar(select(func.count(Booking.id)))
+    
+    return {
+        "total_users": total_users,
+        "active_users": active_users,
+        "inactive_users": total_users - active_users,
+        "admin_users": admin_users,
+        "total_revenue": total_revenue,
+        "total_bookings": total_bookings,
+        "pro_users": pro_users,
+        "trial_users": trial_users,
+        "enterprise_users": enterprise_users
+    }
+
+async def get_admin_stats(db: AsyncSession) -> dict:
+    """compute_admin_stats behind a short-TTL cache (Redis, else in-process)"""
+    redis = getattr(app.state, "redis", None)
+    
+    if redis:
+        try:
+            raw = await redis.get(ADMIN_STATS_KEY)
+            if raw:
+                return orjson.loads(raw)
+        except Exception as e:
+            logger.warning(f"Admin stats cache read failed: {str(e)}")
+    else:
+        entry = _admin_stats_cache.get(ADMIN_STATS_KEY)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+    
+    stats = await compute_admin_stats(db)
+    
+    if redis:
+        try:
+            await redis.set(ADMIN_STATS_KEY, orjson.dumps(stats), ex=ADMIN_STATS_TTL)
+        except Exception as e:
+            logger.warning(f"Admin stats cache write failed: {str(e)}")
+    else:
+        _admin_stats_cache[ADMIN_STATS_KEY] = (time.monotonic() + ADMIN_STATS_TTL, stats)
+    
+    return stats
+
+async def invalidate_admin_stats():
+    """Drop cached admin counters after users or revenue change"""
+    _admin_stats_cache.pop(ADMIN_STATS_KEY, None)
+    redis = getattr(app.state, "redis", None)
+    if redis:
+        try:
+            await redis.delete(ADMIN_STATS_KEY)
+        except Exception as e:
+            logger.warning(f"Admin stats cache invalidation failed: {str(e)}")
+
 @app.get("/admin", response_class=HTMLResponse)
 @admin_required
-async def admin_dashboard(request: Request, db: Session = Depends(get_db)):
+async def admin_dashboard(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Admin dashboard"""
     try:
-        # Get all users
-        users = db.query(Business)\
-            .order_by(Business.created_at.desc())\
-            .all()
-        
-        # Get stats
-        total_users = len(users)
-        active_users = len([u for u in users if u.is_active])
-        total_revenue = sum([p.amount for p in db.query(Payment).filter(Payment.status == "success").all()])
-        total_bookings = db.query(Booking).count()
+        stats = await get_admin_stats(db)
+        
+        # User table: only the columns it shows, newest first, one keyset page
+        # at a time (ids grow with signup order, so the primary key is the cursor)
+        limit = page_size(request, ADMIN_USERS_PAGE_SIZE)
+        query = select(Business).options(load_only(
+            Business.name, Business.admin_email, Business.business_type,
+            Business.plan, Business.is_active, Business.is_admin
+        ))
+        cursor = request.query_params.get("cursor", "")
+        if cursor.isdigit():
+            query = query.where(Business.id < int(cursor))
+        users = (await db.execute(
+            query.order_by(Business.id.desc()).limit(limit + 1)
+        )).scalars().all()
+        
+        next_page = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_page = {"limit": limit, "cursor": users[-1].id}
         
         # Recent payments
-        recent_payments = db.query(Payment)\
-            .order_by(Payment.created_at.desc())\
-            .limit(10)\
-            .all()
+        recent_payments = (await db.execute(
+            select(Payment).order_by(Payment.created_at.desc()).limit(10)
+        )).scalars().all()
         
         return templates.TemplateResponse(
             "admin_dashboard.html",
             {
                 "request": request,
                 "users": users,
-                "stats": {
-                    "total_users": total_users,
-                    "active_users": active_users,
-                    "inactive_users": total_users - active_users,
-                    "total_revenue": total_revenue,
-                    "total_bookings": total_bookings,
-                    "pro_users": len([u for u in users if u.plan == "pro"]),
-                    "trial_users": len([u for u in users if u.plan == "trial"]),
-                    "enterprise_users": len([u for u in users if u.plan == "enterprise"])
-                },
+                "next_page": next_page,
+                "stats": stats,
+                **stats,
                 "recent_payments": recent_payments
             }
         )
     except Exception as e:
-        logger.error(f"Admin dashboard error: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Admin dashboard error: {str(e)}")
         return RedirectResponse("/dashboard", 302)
 
 @app.post("/admin/toggle-user/{user_id}")
@@ -1643,62 +2762,75 @@ async def admin_dashboard(request: Request, db: Session = Depends(get_db)):
 async def toggle_user(user_id: int, request: Request, db: Session = Depends(get_db)):
     """Enable/disable user account"""
     try:
-        user = db.query(Business).get(user_id)
-        if not user:
-            return JSONResponse(status_code=404, content={"error": "User not found"})
+        # Flip in SQL and read the result back: one round trip, no row load
+        is_active = db.execute(
+            update(Business)
+            .where(Business.id == user_id)
+            .values(is_active=~Business.is_active)
+            .returning(Business.is_active)
+        ).scalar_one_or_none()
+        if is_active is None:
+            return ORJSONResponse(status_code=404, content={"error": "User not found"})
         
-        user.is_active = not user.is_active
         db.commit()
+        await invalidate_business_cache(user_id)
+        await invalidate_admin_stats()
         
         # Log audit
-        admin = get_user(request, db)
-        log_audit(admin.id, "admin_toggle_user", {
+        admin_id = request.session["business_id"]
+        log_audit(admin_id, "admin_toggle_user", {
             "target_user": user_id,
-            "new_status": user.is_active
+            "new_status": is_active
         }, db)
         
-        logger.info(f"Admin {admin.id} toggled user {user_id} to {user.is_active}")
+        logger.info(f"Admin {admin_id} toggled user {user_id} to {is_active}")
         
-        return {"status": "success", "is_active": user.is_active}
+        return {"status": "success", "is_active": is_active}
         
     except Exception as e:
         logger.error(f"Toggle user error: {str(e)}")
-        return JSONResponse(status_code=500, content={"error": "Failed to update user"})
+        return ORJSONResponse(status_code=500, content={"error": "Failed to update user"})
 
 @app.post("/admin/make-admin/{user_id}")
 @admin_required
 async def make_admin(user_id: int, request: Request, db: Session = Depends(get_db)):
     """Make user admin"""
     try:
-        user = db.query(Business).get(user_id)
-        if not user:
-            return JSONResponse(status_code=404, content={"error": "User not found"})
+        updated = db.execute(
+            update(Business)
+            .where(Business.id == user_id)
+            .values(is_admin=True)
+            .returning(Business.id)
+        ).scalar_one_or_none()
+        if updated is None:
+            return ORJSONResponse(status_code=404, content={"error": "User not found"})
         
-        user.is_admin = True
         db.commit()
+        await invalidate_business_cache(user_id)
+        await invalidate_admin_stats()
         
         # Log audit
-        admin = get_user(request, db)
-        log_audit(admin.id, "admin_make_admin", {
+        admin_id = request.session["business_id"]
+        log_audit(admin_id, "admin_make_admin", {
             "target_user": user_id
         }, db)
         
-        logger.info(f"Admin {admin.id} made user {user_id} an admin")
+        logger.info(f"Admin {admin_id} made user {user_id} an admin")
         
         return {"status": "success"}
         
     except Exception as e:
         logger.error(f"Make admin error: {str(e)}")
-        return JSONResponse(status_code=500, content={"error": "Failed to update user"})
+        return ORJSONResponse(status_code=500, content={"error": "Failed to update user"})
 
 @app.delete("/admin/delete-user/{user_id}")
 @admin_required
 async def delete_user(user_id: int, request: Request, db: Session = Depends(get_db)):
     """Delete user account (soft delete)"""
     try:
-        user = db.query(Business).get(user_id)
+        user = db.get(Business, user_id)
         if not user:
-            return JSONResponse(status_code=404, content={"error": "User not found"})
+            return ORJSONResponse(status_code=404, content={"error": "User not found"})
         
         # Store info before deletion
         user_email = user.admin_email
@@ -1709,22 +2841,24 @@ async def delete_user(user_id: int, request: Request, db: Session = Depends(get_
         user.admin_email = f"deleted_{user.id}@deleted.com"
         user.whatsapp_number = f"deleted_{user.id}"
         db.commit()
+        await invalidate_business_cache(user_id)
+        await invalidate_admin_stats()
         
         # Log audit
-        admin = get_user(request, db)
-        log_audit(admin.id, "admin_delete_user", {
+        admin_id = request.session["business_id"]
+        log_audit(admin_id, "admin_delete_user", {
             "target_user": user_id,
             "target_email": user_email,
             "target_name": user_name
         }, db)
         
-        logger.info(f"Admin {admin.id} deleted user {user_id}")
+        logger.info(f"Admin {admin_id} deleted user {user_id}")
         
         return {"status": "success"}
         
     except Exception as e:
         logger.error(f"Delete user error: {str(e)}")
-        return JSONResponse(status_code=500, content={"error": "Failed to delete user"})
+        return ORJSONResponse(status_code=500, content={"error": "Failed to delete user"})
 
 # =====================================================
 # USER ROUTES
@@ -1743,7 +2877,8 @@ async def settings_page(request: Request, db: Session = Depends(get_db)):
             "settings.html",
             {
                 "request": request,
-                "business": user
+                "business": user,
+                "chat_used": await chat_usage(user)
             }
         )
     except Exception as e:
@@ -1774,6 +2909,8 @@ async def update_settings(
             user.address = sanitize_input(business_address)
         
         db.commit()
+        await invalidate_business_cache(user.id)
+        await invalidate_business_lookup(user.whatsapp_number)
         
         logger.info(f"User {user.id} updated settings")
         
@@ -1782,6 +2919,7 @@ async def update_settings(
             {
                 "request": request,
                 "business": user,
+                "chat_used": await chat_usage(user),
                 "success": "Settings updated successfully!"
             }
         )
@@ -1794,23 +2932,58 @@ async def update_settings(
 # BOOKINGS ROUTES
 # =====================================================
 
+BOOKINGS_PAGE_SIZE = 50
+ADMIN_USERS_PAGE_SIZE = 50
+PAGE_SIZE_MAX = 200
+
+def page_size(request: Request, default: int) -> int:
+    """?limit= clamped to 1..PAGE_SIZE_MAX"""
+    try:
+        return max(1, min(int(request.query_params.get("limit", default)), PAGE_SIZE_MAX))
+    except ValueError:
+        return default
+
 @app.get("/bookings", response_class=HTMLResponse)
 @login_required
-async def bookings_page(request: Request, db: Session = Depends(get_db)):
+async def bookings_page(request: Request, db: AsyncSession = Depends(get_async_db)):
     """View all bookings"""
     try:
-        user = get_user(request, db)
+        # The template only shows the business name; login_required just cached it
+        user = await get_business_snapshot(request.session["business_id"], db)
         if not user:
             return RedirectResponse("/login", 302)
         
-        # Get all bookings with filters
+        # Get all bookings with filters; plain rows, only what the table shows
         status_filter = request.query_params.get("status")
-        query = db.query(Booking).filter(Booking.business_id == user.id)
+        query = select(*BOOKING_LIST_COLUMNS).where(Booking.business_id == user.id)
         
         if status_filter and status_filter != "all":
-            query = query.filter(Booking.status == status_filter)
-        
-        bookings = query.order_by(Booking.booking_date.desc()).all()
+            query = query.where(Booking.status == status_filter)
+        
+        # Keyset pagination on (booking_date, id): each page is an index range
+        # scan, however deep the user has paged
+        limit = page_size(request, BOOKINGS_PAGE_SIZE)
+        cursor_date = request.query_params.get("cursor_date")
+        cursor_id = request.query_params.get("cursor_id", "")
+        if cursor_date and cursor_id.isdigit():
+            query = query.where(or_(
+                Booking.booking_date < cursor_date,
+                and_(Booking.booking_date == cursor_date, Booking.id < int(cursor_id))
+            ))
+        
+        bookings = (await db.execute(
+            query.order_by(Booking.booking_date.desc(), Booking.id.desc()).limit(limit + 1)
+        )).all()
+        
+        next_page = None
+        if len(bookings) > limit:
+            bookings = bookings[:limit]
+            next_page = {
+                "status": status_filter or "all",
+                "limit": limit,
+                "cursor_date": bookings[-1].booking_date,
+                "cursor_id": bookings[-1].id
+            }
         
         return templates.TemplateResponse(
             "bookings.html",
@@ -1818,7 +2991,8 @@ async def bookings_page(request: Request, db: Session = Depends(get_db)):
                 "request": request,
                 "business": user,
                 "bookings": bookings,
-                "current_filter": status_filter or "all"
+                "current_filter": status_filter or "all",
+                "next_page": next_page
             }
         )
     except Exception as e:
@@ -1830,16 +3004,15 @@ async def bookings_page(request: Request, db: Session = Depends(get_db)):
 async def cancel_booking(booking_id: int, request: Request, db: Session = Depends(get_db)):
     """Cancel a booking"""
     try:
-        user = get_user(request, db)
-        if not user:
-            return JSONResponse(status_code=401, content={"error": "Unauthorized"})
+        # login_required guarantees the session id; no need to load the row
+        business_id = request.session["business_id"]
         
         booking = db.query(Booking)\
-            .filter(Booking.id == booking_id, Booking.business_id == user.id)\
+            .filter(Booking.id == booking_id, Booking.business_id == business_id)\
             .first()
         
         if not booking:
-            return JSONResponse(status_code=404, content={"error": "Booking not found"})
+            return ORJSONResponse(status_code=404, content={"error": "Booking not found"})
         
         booking.status = "cancelled"
         db.commit()
@@ -1848,52 +3021,69 @@ async def cancel_booking(booking_id: int, request: Request, db: Session = Depend
         
     except Exception as e:
         logger.error(f"Cancel booking error: {str(e)}")
-        return JSONResponse(status_code=500, content={"error": "Failed to cancel booking"})
+        return ORJSONResponse(status_code=500, content={"error": "Failed to cancel booking"})
 
 # =====================================================
 # EXPORT ROUTES
 # =====================================================
 
+EXPORT_CHUNK_ROWS = 1000
+
+async def stream_bookings_csv(stmt):
+    """Yield the CSV header, then one chunk per EXPORT_CHUNK_ROWS bookings"""
+    output = StringIO()
+    writer = csv.writer(output)
+    
+    writer.writerow(['ID', 'Name', 'Phone', 'Email', 'Date', 'Time', 'Status', 'Created At'])
+    yield output.getvalue()
+    
+    # Own session: the request-scoped one may be closed while we stream
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            output.seek(0)
+            output.truncate()
+            for b in rows:
+                writer.writerow([
+                    b.id,
+                    b.name,
+                    b.phone,
+                    b.email or '',
+                    b.booking_date,
+                    b.booking_time,
+                    b.status,
+                    b.created_at.strftime('%Y-%m-%d %H:%M:%S')
+                ])
+            yield output.getvalue()
+
 @app.get("/export/bookings")
 @login_required
-async def export_bookings(request: Request, db: Session = Depends(get_db)):
+async def export_bookings(request: Request):
     """Export bookings as CSV"""
     try:
-        user = get_user(request, db)
-        if not user:
-            return RedirectResponse("/login", 302)
+        business_id = request.session["business_id"]
+        
+        stmt = (
+            select(
+                Booking.id,
+                Booking.name,
+                Booking.phone,
+                Booking.email,
+                Booking.booking_date,
+                Booking.booking_time,
+                Booking.status,
+                Booking.created_at
+            )
+            .where(Booking.business_id == business_id)
+            .order_by(Booking.created_at.desc())
+            .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+        )
         
-        # Create CSV in memory
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(['ID', 'Name', 'Phone', 'Email', 'Date', 'Time', 'Status', 'Created At'])
-        
-        # Write data
-        bookings = db.query(Booking)\
-            .filter(Booking.business_id == user.id)\
-            .order_by(Booking.created_at.desc())\
-            .all()
-        
-        for b in bookings:
-            writer.writerow([
-                b.id,
-                b.name,
-                b.phone,
-                b.email or '',
-                b.booking_date,
-                b.booking_time,
-                b.status,
-                b.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-        
-        # Return as downloadable file
-        output.seek(0)
         filename = f"bookings_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
-        return Response(
-            content=output.getvalue(),
+        # Stream from a server-side cursor: memory stays at one chunk of rows
+        return StreamingResponse(
+            stream_bookings_csv(stmt),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
@@ -1906,49 +3096,46 @@ async def export_bookings(request: Request, db: Session = Depends(get_db)):
 # STATIC PAGES
 # =====================================================
 
+@lru_cache(maxsize=16)
+def render_static_page(name: str, day: date) -> bytes:
+    """Render a policy page once per UTC day; only its date stamp ever changes"""
+    return templates.get_template(f"{name}.html").render(
+        support_email=settings.SUPPORT_EMAIL,
+        now=day
+    ).encode()
+
+STATIC_PAGE_MAX_AGE = 3600  # pages re-render daily; an hour of staleness is fine
+
+def static_page(name: str) -> HTMLResponse:
+    return HTMLResponse(
+        render_static_page(name, datetime.utcnow().date()),
+        headers={"Cache-Control": f"public, max-age={STATIC_PAGE_MAX_AGE}"}
+    )
+
 @app.get("/privacy", response_class=HTMLResponse)
 async def privacy(request: Request):
     """Privacy policy page"""
-    return templates.TemplateResponse(
-        "privacy.html",
-        {"request": request, "now": datetime.utcnow()}
-    )
+    return static_page("privacy")
 
 @app.get("/terms", response_class=HTMLResponse)
 async def terms(request: Request):
     """Terms of service page"""
-    return templates.TemplateResponse(
-        "terms.html",
-        {"request": request, "now": datetime.utcnow()}
-    )
+    return static_page("terms")
 
 @app.get("/refund", response_class=HTMLResponse)
 async def refund(request: Request):
     """Refund policy page"""
-    return templates.TemplateResponse(
-        "refund.html",
-        {"request": request, "now": datetime.utcnow()}
-    )
+    return static_page("refund")
 
 @app.get("/about", response_class=HTMLResponse)
 async def about(request: Request):
     """About page"""
-    return templates.TemplateResponse(
-        "about.html",
-        {"request": request, "now": datetime.utcnow()}
-    )
+    return static_page("about")
 
 @app.get("/contact", response_class=HTMLResponse)
 async def contact(request: Request):
     """Contact page"""
-    return templates.TemplateResponse(
-        "contact.html",
-        {
-            "request": request,
-            "support_email": settings.SUPPORT_EMAIL,
-            "now": datetime.utcnow()
-        }
-    )
+    return static_page("contact")
 
 # =====================================================
 # DEBUG ROUTES (Development Only)
@@ -1982,132 +3169,125 @@ if settings.DEBUG:
     async def debug_db(db: Session = Depends(get_db)):
         """Test database connection"""
         try:
-            result = db.execute("SELECT 1").first()
+            result = db.execute(text("SELECT 1")).first()
             return {
                 "database": "connected",
                 "result": result[0] if result else None,
                 "tables": {
-                    "businesses": db.query(Business).count(),
-                    "bookings": db.query(Booking).count(),
-                    "payments": db.query(Payment).count(),
-                    "audit_logs": db.query(AuditLog).count(),
-                    "conversations": db.query(Conversation).count()
+                    "businesses": db.query(func.count(Business.id)).scalar(),
+                    "bookings": db.query(func.count(Booking.id)).scalar(),
+                    "payments": db.query(func.count(Payment.id)).scalar(),
+                    "audit_logs": db.query(func.count(AuditLog.id)).scalar(),
+                    "conversations": db.query(func.count(Conversation.id)).scalar()
                 }
             }
         except Exception as e:
             return {"database": "error", "error": str(e)}
     
     @app.get("/debug/session")
-    async def debug_session(request: Request):
-        """Debug session data"""
-        return {
+    async def debug_session(request: Request, db: Session = Depends(get_db)):
+        """Debug session and user data"""
+        results = {
+            "is_logged": is_logged(request),
             "session_id": request.session.get("business_id"),
-            "session_data": dict(request.session)
+            "session_data": dict(request.session),
         }
-
-@app.get("/debug/session")
-async def debug_session(request: Request, db: Session = Depends(get_db)):
-    """Debug session and user data"""
-    results = {
-        "is_logged": is_logged(request),
-        "session_id": request.session.get("business_id"),
-        "session_data": dict(request.session),
-    }
     
-    if is_logged(request):
-        user = get_user(request, db)
-        if user:
-            results["user"] = {
-                "id": user.id,
-                "name": user.name,
-                "email": user.admin_email,
-                "plan": user.plan,
-                "chat_used": user.chat_used,
-                "chat_limit": user.chat_limit,
-                "trial_ends_at": str(user.trial_ends_at) if user.trial_ends_at else None,
-                "onboarding_done": user.onboarding_done
-            }
-        else:
-            results["user"] = "User not found in database"
+        if is_logged(request):
+            user = get_user(request, db)
+            if user:
+                results["user"] = {
+                    "id": user.id,
+                    "name": user.name,
+                    "email": user.admin_email,
+                    "plan": user.plan,
+                    "chat_used": user.chat_used,
+                    "chat_limit": user.chat_limit,
+                    "trial_ends_at": str(user.trial_ends_at) if user.trial_ends_at else None,
+                    "onboarding_done": user.onboarding_done
+                }
+            else:
+                results["user"] = "User not found in database"
     
-    return results
-
-@app.get("/debug/dashboard-raw")
-async def debug_dashboard_raw(request: Request, db: Session = Depends(get_db)):
-    """Raw dashboard debug - no templates"""
-    try:
-        # Check login
-        if not is_logged(request):
-            return {"error": "Not logged in", "session": dict(request.session)}
-        
-        user = get_user(request, db)
-        if not user:
-            return {"error": "User not found in database", "session_id": request.session.get("business_id")}
-        
-        # Test each database query
-        results = {
-            "user": {
-                "id": user.id,
-                "name": user.name,
-                "plan": user.plan,
-                "chat_used": user.chat_used,
-                "chat_limit": user.chat_limit,
-            }
-        }
-        
-        # Test bookings query
+        return results
+    
+    @app.get("/debug/dashboard-raw")
+    async def debug_dashboard_raw(request: Request, db: Session = Depends(get_db)):
+        """Raw dashboard debug - no templates"""
         try:
-            bookings = db.query(Booking).filter(Booking.business_id == user.id).limit(1).all()
-            results["bookings_query"] = f"✅ Success, found {len(bookings)}"
-        except Exception as e:
-            results["bookings_query"] = f"❌ Failed: {str(e)}"
+            # Check login
+            if not is_logged(request):
+                return {"error": "Not logged in", "session": dict(request.session)}
+        
+            user = get_user(request, db)
+            if not user:
+                return {"error": "User not found in database", "session_id": request.session.get("business_id")}
+        
+            # Test each database query
+            results = {
+                "user": {
+                    "id": user.id,
+                    "name": user.name,
+                    "plan": user.plan,
+                    "chat_used": user.chat_used,
+                    "chat_limit": user.chat_limit,
+                }
+            }
         
-        # Test analytics calculations
-        try:
-            total_bookings = db.query(Booking).filter(Booking.business_id == user.id).count()
-            results["total_bookings"] = total_bookings
-        except Exception as e:
-            results["total_bookings_error"] = str(e)
+            # Test bookings query
+            try:
+                bookings = db.query(Booking).filter(Booking.business_id == user.id).limit(1).all()
+                results["bookings_query"] = f"✅ Success, found {len(bookings)}"
+            except Exception as e:
+                results["bookings_query"] = f"❌ Failed: {str(e)}"
+        
+            # Test analytics calculations
+            try:
+                total_bookings = db.query(func.count(Booking.id))\
+                    .filter(Booking.business_id == user.id)\
+                    .scalar()
+                results["total_bookings"] = total_bookings
+            except Exception as e:
+                results["total_bookings_error"] = str(e)
+        
+            try:
+                cancelled = db.query(func.count(Booking.id)).filter(
+                    Booking.business_id == user.id, 
+                    Booking.status == "cancelled"
+                ).scalar()
+                results["cancelled"] = cancelled
+            except Exception as e:
+                results["cancelled_error"] = str(e)
+        
+            # Test trial days calculation
+            try:
+                if user.plan == "trial" and user.trial_ends_at:
+                    trial_days = (user.trial_ends_at - datetime.utcnow()).days
+                    results["trial_days"] = trial_days
+                else:
+                    results["trial_days"] = "N/A"
+            except Exception as e:
+                results["trial_days_error"] = str(e)
+        
+            return results
         
-        try:
-            cancelled = db.query(Booking).filter(
-                Booking.business_id == user.id, 
-                Booking.status == "cancelled"
-            ).count()
-            results["cancelled"] = cancelled
         except Exception as e:
-            results["cancelled_error"] = str(e)
-        
-        # Test trial days calculation
-        try:
-            if user.plan == "trial" and user.trial_ends_at:
-                trial_days = (user.trial_ends_at - datetime.utcnow()).days
-                results["trial_days"] = trial_days
-            else:
-                results["trial_days"] = "N/A"
-        except Exception as e:
-            results["trial_days_error"] = str(e)
-        
-        return results
-        
-    except Exception as e:
+            return {
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }
+    
+    @app.get("/debug/templates")
+    async def debug_templates():
+        """Check which templates exist"""
+        template_dir = "templates"
+        files = os.listdir(template_dir) if os.path.exists(template_dir) else []
         return {
-            "error": str(e),
-            "traceback": traceback.format_exc()
+            "template_dir_exists": os.path.exists(template_dir),
+            "templates": files,
+            "working_dir": os.getcwd()
         }
 
-@app.get("/debug/templates")
-async def debug_templates():
-    """Check which templates exist"""
-    import os
-    template_dir = "templates"
-    files = os.listdir(template_dir) if os.path.exists(template_dir) else []
-    return {
-        "template_dir_exists": os.path.exists(template_dir),
-        "templates": files,
-        "working_dir": os.getcwd()
-    }
-
 # =====================================================
 # MAIN ENTRY POINT
 # =====================================================
@@ -2121,5 +3301,11 @@ if __name__ == "__main__":
         port=port,
         reload=settings.DEBUG,
         log_level="debug" if settings.DEBUG else "info",
-        workers=4 if not settings.DEBUG else 1  # Multiple workers in production
+        # "auto" picks uvloop/httptools when installed (uvicorn[standard], not on Windows)
+        loop="auto",
+        http="auto",
+        backlog=2048,
+        # WEB_CONCURRENCY workers (default 1, like uvicorn's CLI); the DB
+        # pools are divided by the same count (see database.py)
+        workers=1 if settings.DEBUG else WEB_CONCURRENCY
     )
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Schema upgrades for databases created before a column or index existed.
+
+Base.metadata.create_all only creates missing tables; it never alters an
+existing one. Every step below inspects the live schema first and only
+does what is missing, so upgrade() is safe to run on each deploy against
+a fresh database, an up-to-date one, or one several releases behind.
+"""
+import logging
+
+from sqlalchemy import bindparam, func, inspect, select, text, update
+
+from database import engine as default_engine
+from date_utils import booking_datetime_utc
+from models import Base, Booking, Business
+
+logger = logging.getLogger("bizflow.migrations")
+
+
+# Ordered; each takes the engine and returns nothing. Steps must be
+# idempotent (check before changing) since all of them run every deploy.
+STEPS = []
+
+
+def step(fn):
+    """Register an upgrade step (runs in definition order)"""
+    STEPS.append(fn)
+    return fn
+
+
+def column_names(engine, table):
+    return {c["name"] for c in inspect(engine).get_columns(table)}
+
+
+def upgrade(engine=None):
+    """Create missing tables, then bring existing ones up to the models"""
+    engine = engine or default_engine
+    Base.metadata.create_all(bind=engine)
+    for fn in STEPS:
+        logger.info(f"Migration step: {fn.__name__}")
+        fn(engine)
+
+
+# Columns added to existing tables after the first deploys: (table, column, DDL).
+# The defaults fill existing rows as the column is added.
+ADDED_COLUMNS = (
+    ("businesses", "timezone", "VARCHAR DEFAULT 'Asia/Kolkata'"),
+    ("businesses", "chat_period", "VARCHAR(6)"),
+    ("bookings", "booking_datetime_utc", "TIMESTAMP"),
+    ("bookings", "reminder_24h_sent", "BOOLEAN DEFAULT FALSE"),
+    ("bookings", "reminder_2h_sent", "BOOLEAN DEFAULT FALSE"),
+)
+
+BACKFILL_BATCH = 1000
+
+
+@step
+def add_missing_columns(engine):
+    for table, column, ddl in ADDED_COLUMNS:
+        if column in column_names(engine, table):
+            continue
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        logger.info(f"Added {table}.{column}")
+
+
+@step
+def backfill_booking_datetime_utc(engine):
+    """Resolve the UTC slot for bookings stored before the column existed"""
+    rows_stmt = (
+        select(Booking.id, Booking.booking_date, Booking.booking_time, Business.timezone)
+        .join(Business, Business.id == Booking.business_id)
+        .where(Booking.booking_datetime_utc.is_(None), Booking.id > bindparam("after"))
+        .order_by(Booking.id)
+        .limit(BACKFILL_BATCH)
+    )
+    update_stmt = (
+        update(Booking)
+        .where(Booking.id == bindparam("booking_id"))
+        .values(booking_datetime_utc=bindparam("slot"))
+    )
+    
+    after, filled = 0, 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(rows_stmt, {"after": after}).all()
+            if not rows:
+                break
+            after = rows[-1].id
+            # Unparseable legacy strings stay NULL (and out of reminders)
+            params = [
+                {"booking_id": r.id, "slot": slot}
+                for r in rows
+                if (slot := booking_datetime_utc(r.booking_date, r.booking_time, r.timezone))
+            ]
+            if params:
+                conn.execute(update_stmt, params)
+                filled += len(params)
+    if filled:
+        logger.info(f"Backfilled booking_datetime_utc on {filled} bookings")
+
+
+@step
+def normalize_admin_emails(engine):
+    """Lowercase legacy emails so the unique ix_business_email_lower can be built"""
+    normalized = func.lower(func.trim(Business.admin_email))
+    with engine.begin() as conn:
+        clashes = conn.execute(
+            select(normalized).group_by(normalized).having(func.count() > 1)
+        ).scalars().all()
+        if clashes:
+            # Two accounts that would log in as the same address: needs a human
+            raise RuntimeError(
+                f"Emails differing only by case/whitespace, merge these accounts first: {clashes}"
+            )
+        conn.execute(
+            update(Business)
+            .where(Business.admin_email != normalized)
+            .values(admin_email=normalized)
+        )
+
+
+def index_names(conn):
+    """Every index in the schema, read from the catalog (the inspector skips
+    expression indexes on some backends)"""
+    if conn.dialect.name == "postgresql":
+        sql = "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()"
+    else:
+        sql = "SELECT name FROM sqlite_master WHERE type = 'index'"
+    return set(conn.execute(text(sql)).scalars())
+
+
+# Left behind by an interrupted CREATE INDEX CONCURRENTLY; must be rebuilt
+INVALID_INDEXES_SQL = """
+SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+WHERE NOT i.indisvalid
+"""
+
+
+@step
+def create_missing_indexes(engine):
+    """
+    Indexes declared on the models but missing from existing tables. On
+    PostgreSQL they are built CONCURRENTLY (outside a transaction), so
+    writes to the table keep flowing while a large index builds.
+    """
+    postgres = engine.dialect.name == "postgresql"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        existing = index_names(conn)
+        invalid = set(conn.execute(text(INVALID_INDEXES_SQL)).scalars()) if postgres else set()
+        
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name in invalid:
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                elif index.name in existing:
+                    continue
+                
+                if postgres:
+                    index.dialect_options["postgresql"]["concurrently"] = True
+                try:
+                    index.create(conn)
+                finally:
+                    if postgres:
+                        index.dialect_options["postgresql"]["concurrently"] = False
+                logger.info(f"Created index {index.name}")
+
+
+# Counters made NOT NULL after launch: (column, default)
+NOT_NULL_COUNTERS = (("chat_used", 0), ("chat_limit", 1000))
+
+
+@step
+def chat_counters_not_null(engine):
+    """Backfill NULL counters and enforce NOT NULL + server default"""
+    columns = {c["name"]: c for c in inspect(engine).get_columns("businesses")}
+    for column, default in NOT_NULL_COUNTERS:
+        if not columns[column]["nullable"]:
+            continue
+        with engine.begin() as conn:
+            filled = conn.execute(text(
+                f"UPDATE businesses SET {column} = {default} WHERE {column} IS NULL"
+            )).rowcount
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(
+                    f"ALTER TABLE businesses ALTER COLUMN {column} SET DEFAULT {default}, "
+                    f"ALTER COLUMN {column} SET NOT NULL"
+                ))
+                logger.info(f"businesses.{column} is now NOT NULL")
+            elif filled:
+                # SQLite can't alter constraints in place; NULLs are backfilled
+                # and the ORM default keeps new rows filled
+                logger.info(f"Backfilled {filled} NULL businesses.{column}")
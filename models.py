@@ -8,10 +8,13 @@ from sqlalchemy import (
     ForeignKey,
     Boolean,
     Float,
-    JSON
+    JSON,
+    Index,
+    text,
+    func
 )
 
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 
 from database import Base
@@ -42,6 +45,9 @@ class Business(Base):
     # Add business hours for better customer info
     business_hours = Column(String, nullable=True)
 
+    # Used to convert local booking date/time to UTC for reminders
+    timezone = Column(String, default="Asia/Kolkata")
+
     whatsapp_number = Column(String, unique=True, nullable=False, index=True)
 
     flow_state = Column(String(50), default="start")
@@ -79,9 +85,11 @@ class Business(Base):
 
     # ---------------- USAGE ----------------
 
-    chat_used = Column(Integer, default=0)
+    chat_used = Column(Integer, default=0, server_default="0", nullable=False)
+
+    chat_period = Column(String(6), nullable=True)  # yyyymm that chat_used counts
 
-    chat_limit = Column(Integer, default=1000)  # Increased default to 1000
+    chat_limit = Column(Integer, default=1000, server_default="1000", nullable=False)  # Increased default to 1000
 
 
     # ---------------- STATUS ----------------
@@ -137,10 +145,23 @@ class Business(Base):
         passive_deletes=True
     )
 
+    @validates("admin_email")
+    def _normalize_email(self, key, value):
+        # Stored lowercased so login's admin_email == ? hits the index directly
+        return value.strip().lower() if value else value
+
     def __repr__(self):
         return f"<Business {self.id}: {self.name}>"
 
 
+# Case-insensitive uniqueness; also serves any lower(admin_email) lookup
+Index(
+    "ix_business_email_lower",
+    func.lower(Business.admin_email),
+    unique=True
+)
+
+
 # =================================================
 # PAYMENT MODEL
 # =================================================
@@ -148,6 +169,11 @@ class Business(Base):
 class Payment(Base):
     __tablename__ = "payments"
     
+    __table_args__ = (
+        # Billing page payment history (scanned backwards for DESC)
+        Index("ix_payment_business_created", "business_id", "created_at"),
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     
     # Foreign key to business
@@ -228,6 +254,11 @@ class Conversation(Base):
 
     __tablename__ = "conversations"
 
+    # Covers the per-business stage counts in analytics
+    __table_args__ = (
+        Index("ix_conv_business_stage", "business_id", "stage"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
 
     business_id = Column(
@@ -279,6 +310,40 @@ class Booking(Base):
 
     __tablename__ = "bookings"
 
+    __table_args__ = (
+        # Covers the per-business status / created_at counts in analytics
+        Index(
+            "ix_booking_business_status_created",
+            "business_id",
+            "status",
+            "created_at"
+        ),
+        # Dashboard "recent bookings" (scanned backwards for DESC)
+        Index("ix_booking_business_created", "business_id", "created_at"),
+        # Dashboard cancelled count
+        Index(
+            "ix_booking_business_cancelled",
+            "business_id",
+            postgresql_where=text("status = 'cancelled'"),
+            sqlite_where=text("status = 'cancelled'")
+        ),
+        # Bookings page filtered by status, ordered by booking_date
+        Index(
+            "ix_booking_business_status_date",
+            "business_id",
+            "status",
+            "booking_date"
+        ),
+        # Double-booking check in the WhatsApp booking flow; also serves the
+        # unfiltered bookings page (business_id, booking_date order)
+        Index(
+            "ix_booking_conflict",
+            "business_id",
+            "booking_date",
+            "booking_time"
+        ),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
 
     business_id = Column(
@@ -294,11 +359,19 @@ class Booking(Base):
     booking_date = Column(String, nullable=False, index=True)  # Format: DD-MM-YYYY
     booking_time = Column(String, nullable=False)  # Format: HH:MM
 
+    # booking_date + booking_time in the business timezone, as naive UTC
+    booking_datetime_utc = Column(DateTime, nullable=True, index=True)
+
     # Booked | Cancelled | Completed | NoShow
     status = Column(String, default="Booked", index=True)
 
     notes = Column(Text, nullable=True)  # Added notes field
 
+    # ---------------- REMINDERS ----------------
+
+    reminder_24h_sent = Column(Boolean, default=False)
+    reminder_2h_sent = Column(Boolean, default=False)
+
     # ---------------- META ----------------
 
     # whatsapp | manual | api
@@ -313,9 +386,11 @@ class Booking(Base):
 
     # ---------------- RELATION ----------------
 
+    # Loaded explicitly (joinedload) where needed; never lazily per row
     business = relationship(
         "Business",
-        back_populates="bookings"
+        back_populates="bookings",
+        lazy="raise"
     )
 
     def __repr__(self):
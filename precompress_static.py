@@ -0,0 +1,40 @@
+"""
+Write level-9 .gz siblings for text assets in static/, so requests never
+compress them (CachedStaticFiles in main.py serves the siblings).
+
+Run at build time (railway.json buildCommand): the files are part of the
+image, and app workers never write into the deploy tree.
+"""
+import gzip
+import logging
+import os
+
+logger = logging.getLogger("bizflow.static")
+
+STATIC_COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".html", ".map")
+
+
+def precompress_static(directory: str = "static") -> int:
+    """Compress stale or missing siblings; returns how many were written"""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(STATIC_COMPRESSIBLE):
+                continue
+            path = os.path.join(root, name)
+            target = path + ".gz"
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                continue
+            with open(path, "rb") as src:
+                data = gzip.compress(src.read(), compresslevel=9, mtime=0)
+            # Write then rename, so a reader never sees a half-written file
+            with open(target + ".tmp", "wb") as dst:
+                dst.write(data)
+            os.replace(target + ".tmp", target)
+            written += 1
+    return written
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logger.info(f"Precompressed {precompress_static()} static files")
@@ -1,4 +1,5 @@
 from twilio.rest import Client
+from twilio.http.async_http_client import AsyncTwilioHttpClient
 import os
 from dotenv import load_dotenv
 
@@ -10,9 +11,40 @@ FROM_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER")
 
 client = Client(ACCOUNT_SID, AUTH_TOKEN)
 
+# Async client shares one pooled HTTP session; created on first use so it
+# binds to the running event loop
+async_client = None
+
+
 def send_whatsapp_message(to, message):
     client.messages.create(
         from_=FROM_NUMBER,
         to=f"whatsapp:{to}",
         body=message
     )
+
+
+def get_async_client():
+    global async_client
+    if async_client is None:
+        async_client = Client(
+            ACCOUNT_SID,
+            AUTH_TOKEN,
+            http_client=AsyncTwilioHttpClient()
+        )
+    return async_client
+
+
+async def send_whatsapp_message_async(to, message):
+    await get_async_client().messages.create_async(
+        from_=FROM_NUMBER,
+        to=f"whatsapp:{to}",
+        body=message
+    )
+
+
+async def close_async_client():
+    global async_client
+    if async_client is not None:
+        await async_client.http_client.close()
+        async_client = None
@@ -0,0 +1,83 @@
+"""
+Shared fixtures. main.py reads its settings when imported, so the
+environment is pinned here first: a throwaway SQLite database, development
+mode, and no Redis unless a test asks for the fake one.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bizflow-tests-')}/test.db"
+os.environ["ENVIRONMENT"] = "development"
+os.environ.pop("REDIS_URL", None)
+
+# Templates, static files and logs are resolved against the working directory
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import fakeredis  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+import migrations  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from models import Base, Business  # noqa: E402
+
+PASSWORD = "Abcdef1!"
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    """Empty schema and in-process caches for every test; slowapi limits off"""
+    Base.metadata.drop_all(bind=engine)
+    migrations.upgrade(engine)
+    main._business_cache.clear()
+    main._webhook_hits.clear()
+    main._admin_stats_cache.clear()
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    yield
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """
+    In-memory Redis the app connects to on startup. Set
+    redis_server.connected = False to simulate an outage.
+    """
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(main.settings, "REDIS_URL", "redis://fake")
+    monkeypatch.setattr(
+        main.aioredis,
+        "from_url",
+        lambda url, **kwargs: fakeredis.FakeAsyncRedis(
+            server=server, decode_responses=kwargs.get("decode_responses", False)
+        )
+    )
+    return server
+
+
+@pytest.fixture
+def client():
+    """Running app (lifespan included); request redis_server first for Redis"""
+    with TestClient(main.app, base_url="http://localhost") as test_client:
+        yield test_client
+
+
+def signup(client, email="owner@example.com", phone="9999999999") -> int:
+    """Create an account through the signup form (which also logs it in)"""
+    client.post("/signup", data={
+        "name": "Test Gym",
+        "phone": phone,
+        "email": email,
+        "password": PASSWORD,
+        "business_type": "gym"
+    })
+    db = SessionLocal()
+    try:
+        return db.query(Business.id).filter(Business.admin_email == email).scalar()
+    finally:
+        db.close()
@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime
+
+import fakeredis
+import pytest
+
+import main
+from database import SessionLocal
+from models import Business
+
+PERIOD = f"{datetime.utcnow():%Y%m}"
+
+
+def make_business(**values) -> int:
+    db = SessionLocal()
+    business = Business(
+        name="Quota Gym",
+        whatsapp_number="9999999999",
+        admin_email="quota@example.com",
+        admin_password="x",
+        **values
+    )
+    db.add(business)
+    db.commit()
+    business_id = business.id
+    db.close()
+    return business_id
+
+
+def counters(business_id):
+    db = SessionLocal()
+    try:
+        business = db.get(Business, business_id)
+        return business.chat_used, business.chat_period
+    finally:
+        db.close()
+
+
+async def consume(business_id, times):
+    """Call consume_chat_quota like the webhook does: fresh session, commit after"""
+    results = []
+    for _ in range(times):
+        db = SessionLocal()
+        try:
+            results.append(await main.consume_chat_quota(db.get(Business, business_id), db))
+            db.commit()
+        finally:
+            db.close()
+    return results
+
+
+@pytest.fixture
+def no_redis(monkeypatch):
+    monkeypatch.setattr(main.app.state, "redis", None, raising=False)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        main.app.state, "redis",
+        fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+        raising=False
+    )
+    return server
+
+
+def chat_key(business_id):
+    return f"chat:{business_id}:{PERIOD}"
+
+
+# ---------------- DB backend ----------------
+
+def test_db_counts_until_the_limit(no_redis):
+    business_id = make_business(chat_used=0, chat_limit=2, chat_period=PERIOD)
+
+    assert asyncio.run(consume(business_id, 3)) == [True, True, False]
+    assert counters(business_id) == (2, PERIOD)
+
+
+def test_db_count_restarts_in_a_new_month(no_redis):
+    business_id = make_business(chat_used=5, chat_limit=5, chat_period="202001")
+
+    assert asyncio.run(consume(business_id, 1)) == [True]
+    assert counters(business_id) == (1, PERIOD)
+
+
+def test_db_count_without_a_period_starts_fresh(no_redis):
+    business_id = make_business(chat_used=5, chat_limit=5)
+
+    assert asyncio.run(consume(business_id, 1)) == [True]
+    assert counters(business_id) == (1, PERIOD)
+
+
+# ---------------- Redis backend ----------------
+
+def test_redis_counter_is_seeded_from_the_db(fake_redis):
+    business_id = make_business(chat_used=18, chat_limit=20, chat_period=PERIOD)
+
+    assert asyncio.run(consume(business_id, 3)) == [True, True, False]
+
+    redis = fakeredis.FakeRedis(server=fake_redis, decode_responses=True)
+    assert redis.get(chat_key(business_id)) == "21"
+    assert redis.ttl(chat_key(business_id)) > 0
+    # Synced when the limit was reached
+    assert counters(business_id) == (20, PERIOD)
+
+
+def test_redis_ignores_a_db_count_from_an_earlier_month(fake_redis):
+    business_id = make_business(chat_used=18, chat_limit=20, chat_period="202001")
+
+    assert asyncio.run(consume(business_id, 1)) == [True]
+    redis = fakeredis.FakeRedis(server=fake_redis, decode_responses=True)
+    assert redis.get(chat_key(business_id)) == "1"
+
+
+def test_redis_outage_falls_back_to_the_db(fake_redis):
+    business_id = make_business(chat_used=3, chat_limit=20, chat_period=PERIOD)
+    fake_redis.connected = False
+
+    assert asyncio.run(consume(business_id, 1)) == [True]
+    assert counters(business_id) == (4, PERIOD)
+
+
+def test_usage_reads_the_live_redis_counter(fake_redis):
+    business_id = make_business(chat_used=0, chat_limit=100, chat_period=PERIOD)
+    asyncio.run(consume(business_id, 3))
+
+    db = SessionLocal()
+    try:
+        business = db.get(Business, business_id)
+        # Not synced to the DB yet, but pages see the live count
+        assert business.chat_used == 0
+        assert asyncio.run(main.chat_usage(business)) == 3
+    finally:
+        db.close()
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import pytest
+
+from date_utils import booking_datetime_utc
+
+
+@pytest.mark.parametrize("date_str, time_str, timezone, expected", [
+    # IST has no DST: always UTC+5:30
+    ("16-10-2026", "16:00", "Asia/Kolkata", datetime(2026, 10, 16, 10, 30)),
+    # Local early morning is the previous UTC day
+    ("01-01-2026", "01:00", "Asia/Tokyo", datetime(2025, 12, 31, 16, 0)),
+    # Local late evening is the next UTC day
+    ("15-01-2026", "20:00", "America/New_York", datetime(2026, 1, 16, 1, 0)),
+    # Same wall clock time, summer vs winter offset
+    ("15-07-2026", "09:00", "Europe/London", datetime(2026, 7, 15, 8, 0)),
+    ("15-01-2026", "09:00", "Europe/London", datetime(2026, 1, 15, 9, 0)),
+    ("15-07-2026", "09:00", "America/New_York", datetime(2026, 7, 15, 13, 0)),
+    ("15-07-2026", "09:00", "UTC", datetime(2026, 7, 15, 9, 0)),
+])
+def test_converts_business_local_time_to_naive_utc(date_str, time_str, timezone, expected):
+    result = booking_datetime_utc(date_str, time_str, timezone)
+    assert result == expected
+    assert result.tzinfo is None
+
+
+def test_missing_timezone_defaults_to_india():
+    assert booking_datetime_utc("16-10-2026", "16:00", None) == datetime(2026, 10, 16, 10, 30)
+
+
+@pytest.mark.parametrize("date_str, time_str, timezone", [
+    ("2026-10-16", "16:00", "Asia/Kolkata"),    # wrong date format
+    ("16-10-2026", "4PM", "Asia/Kolkata"),      # wrong time format
+    ("31-02-2026", "10:00", "Asia/Kolkata"),    # no such day
+    ("16-10-2026", "16:00", "Mars/Olympus"),    # unknown zone
+    (None, "16:00", "Asia/Kolkata"),
+])
+def test_unparseable_values_return_none(date_str, time_str, timezone):
+    assert booking_datetime_utc(date_str, time_str, timezone) is None
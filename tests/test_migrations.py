@@ -0,0 +1,199 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+import migrations
+from models import Base
+
+# businesses and bookings as the first deploys created them: no timezone,
+# chat_period, UTC slot or reminder flags, nullable counters, no
+# case-insensitive email index and none of the composite booking indexes
+LEGACY_SCHEMA = (
+    """
+    CREATE TABLE businesses (
+        id INTEGER NOT NULL PRIMARY KEY,
+        name VARCHAR NOT NULL,
+        goal VARCHAR,
+        business_type VARCHAR,
+        address VARCHAR(255),
+        business_hours VARCHAR,
+        whatsapp_number VARCHAR NOT NULL,
+        flow_state VARCHAR(50),
+        admin_email VARCHAR NOT NULL,
+        admin_password VARCHAR NOT NULL,
+        is_admin BOOLEAN,
+        reset_token VARCHAR UNIQUE,
+        reset_token_expiry DATETIME,
+        "plan" VARCHAR,
+        is_active BOOLEAN,
+        trial_ends_at DATETIME,
+        paid_until DATETIME,
+        plan_started DATETIME,
+        last_order_id VARCHAR,
+        chat_used INTEGER,
+        chat_limit INTEGER,
+        whatsapp_active BOOLEAN,
+        onboarding_done BOOLEAN,
+        settings_json TEXT,
+        created_at DATETIME,
+        updated_at DATETIME,
+        last_login DATETIME
+    )
+    """,
+    "CREATE UNIQUE INDEX ix_businesses_admin_email ON businesses (admin_email)",
+    """
+    CREATE TABLE bookings (
+        id INTEGER NOT NULL PRIMARY KEY,
+        business_id INTEGER REFERENCES businesses (id) ON DELETE CASCADE,
+        phone VARCHAR NOT NULL,
+        name VARCHAR NOT NULL,
+        email VARCHAR,
+        booking_date VARCHAR NOT NULL,
+        booking_time VARCHAR NOT NULL,
+        status VARCHAR,
+        notes TEXT,
+        source VARCHAR,
+        created_at DATETIME,
+        updated_at DATETIME
+    )
+    """,
+    "CREATE INDEX ix_bookings_business_id ON bookings (business_id)",
+)
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+    yield engine
+    engine.dispose()
+
+
+def add_business(engine, business_id, email, **values):
+    row = {
+        "id": business_id,
+        "name": f"Biz {business_id}",
+        "whatsapp_number": f"90000000{business_id:02d}",
+        "admin_email": email,
+        "admin_password": "x",
+        **values
+    }
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"INSERT INTO businesses ({', '.join(row)}) VALUES ({', '.join(':' + k for k in row)})"),
+            row
+        )
+
+
+def add_booking(engine, business_id, booking_date, booking_time):
+    with engine.begin() as conn:
+        return conn.execute(
+            text(
+                "INSERT INTO bookings (business_id, phone, name, booking_date, booking_time) "
+                "VALUES (:business_id, '919876543210', 'Client', :booking_date, :booking_time)"
+            ),
+            {"business_id": business_id, "booking_date": booking_date, "booking_time": booking_time}
+        ).lastrowid
+
+
+def fetch(engine, sql, **params):
+    with engine.connect() as conn:
+        return conn.execute(text(sql), params).all()
+
+
+def test_upgrade_brings_a_legacy_database_up_to_the_models(legacy_engine):
+    add_business(legacy_engine, 1, "Owner@Example.com ")
+
+    migrations.upgrade(legacy_engine)
+
+    businesses = migrations.column_names(legacy_engine, "businesses")
+    bookings = migrations.column_names(legacy_engine, "bookings")
+    assert {"timezone", "chat_period"} <= businesses
+    assert {"booking_datetime_utc", "reminder_24h_sent", "reminder_2h_sent"} <= bookings
+    # Column defaults filled the existing row
+    assert fetch(legacy_engine, "SELECT timezone FROM businesses") == [("Asia/Kolkata",)]
+
+    with legacy_engine.connect() as conn:
+        indexes = migrations.index_names(conn)
+    assert {
+        index.name for table in Base.metadata.sorted_tables for index in table.indexes
+    } <= indexes
+
+
+def test_upgrade_is_idempotent(legacy_engine):
+    migrations.upgrade(legacy_engine)
+    schema = fetch(legacy_engine, "SELECT name, sql FROM sqlite_master ORDER BY name")
+
+    migrations.upgrade(legacy_engine)
+
+    assert fetch(legacy_engine, "SELECT name, sql FROM sqlite_master ORDER BY name") == schema
+
+
+def test_backfill_resolves_slots_in_the_business_timezone(legacy_engine):
+    migrations.add_missing_columns(legacy_engine)
+    add_business(legacy_engine, 1, "india@example.com", timezone="Asia/Kolkata")
+    add_business(legacy_engine, 2, "london@example.com", timezone="Europe/London")
+    india = add_booking(legacy_engine, 1, "15-01-2026", "10:00")
+    london = add_booking(legacy_engine, 2, "15-07-2026", "10:00")
+    garbled = add_booking(legacy_engine, 1, "tomorrow", "evening")
+
+    migrations.backfill_booking_datetime_utc(legacy_engine)
+
+    # SQLAlchemy's SQLite DATETIME storage format
+    slots = dict(fetch(legacy_engine, "SELECT id, booking_datetime_utc FROM bookings"))
+    assert slots[india] == "2026-01-15 04:30:00.000000"
+    assert slots[london] == "2026-07-15 09:00:00.000000"  # BST
+    # Unparseable legacy strings stay NULL
+    assert slots[garbled] is None
+
+
+def test_backfill_walks_every_batch(legacy_engine, monkeypatch):
+    monkeypatch.setattr(migrations, "BACKFILL_BATCH", 2)
+    migrations.add_missing_columns(legacy_engine)
+    add_business(legacy_engine, 1, "owner@example.com", timezone="Asia/Kolkata")
+    for day in range(1, 6):
+        add_booking(legacy_engine, 1, f"{day:02d}-01-2026", "10:00")
+    add_booking(legacy_engine, 1, "not-a-date", "10:00")
+
+    migrations.backfill_booking_datetime_utc(legacy_engine)
+
+    assert fetch(
+        legacy_engine, "SELECT count(*) FROM bookings WHERE booking_datetime_utc IS NULL"
+    ) == [(1,)]
+
+
+def test_admin_emails_are_lowercased_and_trimmed(legacy_engine):
+    add_business(legacy_engine, 1, " Owner@Example.COM")
+    add_business(legacy_engine, 2, "plain@example.com")
+
+    migrations.normalize_admin_emails(legacy_engine)
+
+    assert fetch(legacy_engine, "SELECT admin_email FROM businesses ORDER BY id") == [
+        ("owner@example.com",), ("plain@example.com",)
+    ]
+
+
+def test_admin_emails_differing_only_by_case_stop_the_upgrade(legacy_engine):
+    add_business(legacy_engine, 1, "owner@example.com")
+    add_business(legacy_engine, 2, "OWNER@example.com")
+
+    with pytest.raises(RuntimeError, match="owner@example.com"):
+        migrations.normalize_admin_emails(legacy_engine)
+
+    # Nothing was rewritten
+    assert fetch(legacy_engine, "SELECT admin_email FROM businesses ORDER BY id") == [
+        ("owner@example.com",), ("OWNER@example.com",)
+    ]
+
+
+def test_null_chat_counters_are_backfilled(legacy_engine):
+    add_business(legacy_engine, 1, "null@example.com", chat_used=None, chat_limit=None)
+    add_business(legacy_engine, 2, "set@example.com", chat_used=7, chat_limit=50)
+
+    migrations.chat_counters_not_null(legacy_engine)
+
+    assert fetch(legacy_engine, "SELECT chat_used, chat_limit FROM businesses ORDER BY id") == [
+        (0, 1000), (7, 50)
+    ]
+
@@ -0,0 +1,132 @@
+import html
+import re
+
+import pytest
+from starlette.requests import Request
+
+import main
+from conftest import signup
+from database import SessionLocal
+from models import Booking, Business
+
+NEXT_LINK = re.compile(r'href="(/(?:bookings|admin)\?[^"]+)"')
+
+
+def add_bookings(business_id, rows):
+    """rows: (booking_date, status) in insertion (id) order; named B0, B1, ..."""
+    db = SessionLocal()
+    db.add_all(
+        Booking(
+            business_id=business_id,
+            name=f"B{i}",
+            phone="919876543210",
+            booking_date=booking_date,
+            booking_time="10:00",
+            status=status
+        )
+        for i, (booking_date, status) in enumerate(rows)
+    )
+    db.commit()
+    db.close()
+
+
+def walk(client, url, row_pattern):
+    """Follow "next" links from url; returns the rows shown on each page"""
+    pages = []
+    while url:
+        body = client.get(url).text
+        pages.append(re.findall(row_pattern, body))
+        match = NEXT_LINK.search(body)
+        url = html.unescape(match.group(1)) if match else None
+    return pages
+
+
+def booking_pages(client, url):
+    return walk(client, url, r"<td>(B\d+)</td>")
+
+
+def test_bookings_pages_cover_every_row_once_across_date_ties(client):
+    business_id = signup(client)
+    add_bookings(business_id, [
+        ("01-01-2026", "pending"), ("02-01-2026", "pending"),
+        ("01-01-2026", "pending"), ("02-01-2026", "pending"),
+        ("01-01-2026", "pending"), ("02-01-2026", "pending"),
+        ("01-01-2026", "pending")
+    ])
+
+    pages = booking_pages(client, "/bookings?limit=3")
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    # (booking_date desc, id desc): the cursor splits the tied dates cleanly
+    assert sum(pages, []) == ["B5", "B3", "B1", "B6", "B4", "B2", "B0"]
+
+
+def test_bookings_exactly_full_last_page_has_no_next_link(client):
+    business_id = signup(client)
+    add_bookings(business_id, [("01-01-2026", "pending")] * 6)
+
+    pages = booking_pages(client, "/bookings?limit=3")
+
+    assert [len(page) for page in pages] == [3, 3]
+
+
+def test_bookings_cursor_keeps_the_status_filter(client):
+    business_id = signup(client)
+    add_bookings(business_id, [
+        ("01-01-2026", "cancelled"), ("01-01-2026", "pending"),
+        ("01-01-2026", "cancelled"), ("01-01-2026", "pending")
+    ])
+
+    pages = booking_pages(client, "/bookings?status=cancelled&limit=1")
+
+    assert pages == [["B2"], ["B0"]]
+
+
+def test_bookings_of_other_businesses_never_appear(client):
+    business_id = signup(client)
+    db = SessionLocal()
+    other = Business(
+        name="Other", whatsapp_number="8888888888",
+        admin_email="other@example.com", admin_password="x"
+    )
+    db.add(other)
+    db.commit()
+    other_id = other.id
+    db.close()
+    add_bookings(other_id, [("01-01-2026", "pending")] * 2)
+    add_bookings(business_id, [("01-01-2026", "pending")])
+
+    assert sum(booking_pages(client, "/bookings?limit=1"), []) == ["B0"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    (b"", main.BOOKINGS_PAGE_SIZE),
+    (b"limit=25", 25),
+    (b"limit=0", 1),
+    (b"limit=-5", 1),
+    (b"limit=100000", main.PAGE_SIZE_MAX),
+    (b"limit=abc", main.BOOKINGS_PAGE_SIZE),
+])
+def test_page_size_is_clamped(query, expected):
+    request = Request({"type": "http", "query_string": query, "headers": []})
+    assert main.page_size(request, main.BOOKINGS_PAGE_SIZE) == expected
+
+
+def test_admin_user_list_pages_by_id(client):
+    admin_id = signup(client)
+    db = SessionLocal()
+    db.query(Business).filter(Business.id == admin_id).update({Business.is_admin: True})
+    db.add_all(
+        Business(
+            name=f"Biz {i}", whatsapp_number=f"800000000{i}",
+            admin_email=f"biz{i}@example.com", admin_password="x"
+        )
+        for i in range(4)
+    )
+    db.commit()
+    ids = sorted((row.id for row in db.query(Business.id)), reverse=True)
+    db.close()
+
+    pages = walk(client, "/admin?limit=2", r"<strong>#(\d+)</strong>")
+
+    assert [[int(i) for i in page] for page in pages] == [ids[0:2], ids[2:4], ids[4:]]
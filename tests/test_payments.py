@@ -0,0 +1,218 @@
+import hmac
+from itertools import count
+from unittest import mock
+
+import orjson
+import pytest
+import razorpay
+
+import main
+from conftest import signup
+from database import SessionLocal
+from models import Business, Payment
+
+CHECKOUT_SECRET = b"checkout-secret"
+WEBHOOK_SECRET = "webhook-secret"
+
+
+@pytest.fixture
+def emails(monkeypatch):
+    """Confirmation emails handed to the background senders"""
+    sent = []
+    monkeypatch.setattr(
+        main.EmailService, "enqueue",
+        lambda to_email, subject, template, context=None: sent.append((to_email, template)) or True
+    )
+    return sent
+
+
+@pytest.fixture
+def razorpay_api(monkeypatch):
+    order_ids = count(1)
+    orders = mock.Mock()
+    orders.create.side_effect = lambda data: {"id": f"order_{next(order_ids)}", **data}
+    monkeypatch.setattr(main, "razorpay_client", mock.Mock(order=orders))
+    monkeypatch.setattr(main, "RAZORPAY_SECRET_KEY", CHECKOUT_SECRET)
+    monkeypatch.setattr(main.settings, "RAZORPAY_WEBHOOK_SECRET", WEBHOOK_SECRET)
+    monkeypatch.setattr(main, "RAZORPAY_WEBHOOK_KEY", WEBHOOK_SECRET.encode())
+    return orders
+
+
+@pytest.fixture
+def owner(client, razorpay_api, emails):
+    return signup(client)
+
+
+def checkout(order_id, payment_id):
+    """What Razorpay checkout posts back to /api/payment-success"""
+    signature = hmac.new(CHECKOUT_SECRET, f"{order_id}|{payment_id}".encode(), "sha256").hexdigest()
+    return {
+        "razorpay_order_id": order_id,
+        "razorpay_payment_id": payment_id,
+        "razorpay_signature": signature
+    }
+
+
+def webhook(client, event, order_id, payment_id, secret=WEBHOOK_SECRET):
+    body = orjson.dumps({
+        "event": event,
+        "payload": {"payment": {"entity": {"id": payment_id, "order_id": order_id, "method": "upi"}}}
+    })
+    signature = hmac.new(secret.encode(), body, "sha256").hexdigest()
+    return client.post(
+        "/api/razorpay-webhook",
+        content=body,
+        headers={"x-razorpay-signature": signature}
+    )
+
+
+def payments():
+    db = SessionLocal()
+    try:
+        return db.query(Payment.order_id, Payment.payment_id, Payment.status, Payment.plan).all()
+    finally:
+        db.close()
+
+
+def account(business_id):
+    db = SessionLocal()
+    try:
+        business = db.get(Business, business_id)
+        return business.plan, business.chat_limit, business.paid_until is not None
+    finally:
+        db.close()
+
+
+def create_order(client, plan="starter"):
+    return client.post("/api/create-order", json={"plan": plan}).json()["order_id"]
+
+
+# ---------------- create_order / signatures ----------------
+
+def test_create_order_records_a_pending_payment(client, owner, razorpay_api):
+    response = client.post("/api/create-order", json={"plan": "pro"})
+
+    assert response.status_code == 200
+    assert response.json()["amount"] == main.PLAN_AMOUNT_PAISE["pro"]
+    assert razorpay_api.create.call_args.args[0]["notes"]["plan"] == "pro"
+    assert payments() == [("order_1", "order_1", "pending", "pro")]
+
+
+def test_create_order_rejects_unknown_plans(client, owner):
+    assert client.post("/api/create-order", json={"plan": "platinum"}).status_code == 400
+    assert payments() == []
+
+
+def test_checkout_signature_verification(monkeypatch):
+    monkeypatch.setattr(main, "RAZORPAY_SECRET_KEY", CHECKOUT_SECRET)
+    main.verify_checkout_signature(checkout("order_1", "pay_1"))
+
+    tampered = {**checkout("order_1", "pay_1"), "razorpay_payment_id": "pay_2"}
+    with pytest.raises(razorpay.errors.SignatureVerificationError):
+        main.verify_checkout_signature(tampered)
+    with pytest.raises(razorpay.errors.SignatureVerificationError):
+        main.verify_checkout_signature({"razorpay_order_id": "order_1"})
+
+
+def test_forged_checkout_callback_changes_nothing(client, owner, emails):
+    order_id = create_order(client)
+    forged = {**checkout(order_id, "pay_1"), "razorpay_signature": "0" * 64}
+
+    result = client.post("/api/payment-success", json=forged).json()
+
+    assert result["status"] == "error"
+    assert payments()[0][2] == "pending"
+    assert account(owner)[0] == "trial"
+    assert emails == []
+
+
+# ---------------- settling ----------------
+
+def test_checkout_callback_settles_the_order(client, owner, emails):
+    order_id = create_order(client)
+
+    result = client.post("/api/payment-success", json=checkout(order_id, "pay_1")).json()
+
+    assert result["status"] == "success"
+    assert payments() == [(order_id, "pay_1", "success", "starter")]
+    assert account(owner) == ("starter", main.PLANS["starter"]["chats"], True)
+    assert emails == [("owner@example.com", "payment_success")]
+
+
+def test_webhook_first_then_checkout_callback_reports_success_once(client, owner, emails):
+    order_id = create_order(client)
+
+    assert webhook(client, "payment.captured", order_id, "pay_1").status_code == 200
+    result = client.post("/api/payment-success", json=checkout(order_id, "pay_1")).json()
+
+    assert result["status"] == "success"
+    assert account(owner)[0] == "starter"
+    assert emails == [("owner@example.com", "payment_success")]
+
+
+def test_checkout_callback_first_then_webhook_is_a_no_op(client, owner, emails):
+    order_id = create_order(client)
+
+    client.post("/api/payment-success", json=checkout(order_id, "pay_1"))
+    assert webhook(client, "payment.captured", order_id, "pay_1").status_code == 200
+    # Razorpay redelivers; still settled once
+    assert webhook(client, "payment.captured", order_id, "pay_1").status_code == 200
+
+    assert payments() == [(order_id, "pay_1", "success", "starter")]
+    assert len(emails) == 1
+
+
+def test_failed_attempt_can_still_be_paid(client, owner, emails):
+    order_id = create_order(client)
+
+    webhook(client, "payment.failed", order_id, "pay_1")
+    assert payments()[0][2] == "failed"
+
+    webhook(client, "payment.captured", order_id, "pay_2")
+    assert payments() == [(order_id, "pay_2", "success", "starter")]
+    assert len(emails) == 1
+
+
+def test_failed_event_after_payment_keeps_the_order_paid(client, owner):
+    order_id = create_order(client)
+
+    webhook(client, "payment.captured", order_id, "pay_2")
+    webhook(client, "payment.failed", order_id, "pay_1")
+
+    assert payments()[0][2] == "success"
+
+
+# ---------------- webhook delivery ----------------
+
+def test_webhook_with_a_bad_signature_is_rejected(client, owner):
+    order_id = create_order(client)
+
+    response = webhook(client, "payment.captured", order_id, "pay_1", secret="wrong")
+
+    assert response.status_code == 400
+    assert payments()[0][2] == "pending"
+
+
+def test_webhook_for_an_unknown_order_is_acknowledged(client, owner):
+    assert webhook(client, "payment.captured", "order_404", "pay_1").status_code == 200
+
+
+def test_webhook_failure_is_not_acknowledged_so_razorpay_retries(client, owner, emails):
+    order_id = create_order(client)
+    db = SessionLocal()
+    db.query(Payment).update({Payment.plan: "retired-plan"})
+    db.commit()
+
+    response = webhook(client, "payment.captured", order_id, "pay_1")
+
+    assert response.status_code == 500
+    # The failed event's writes were rolled back
+    assert payments()[0][2] == "pending"
+
+    db.query(Payment).update({Payment.plan: "starter"})
+    db.commit()
+    db.close()
+
+    assert webhook(client, "payment.captured", order_id, "pay_1").status_code == 200
+    assert payments()[0][2] == "success"
+    assert len(emails) == 1
@@ -0,0 +1,74 @@
+import fakeredis
+from itsdangerous import TimestampSigner
+
+import main
+from conftest import PASSWORD, signup
+
+
+def stored_sessions(server):
+    return fakeredis.FakeRedis(server=server).keys("session:*")
+
+
+def plant_cookie(client, session_id):
+    """A validly signed cookie for an id the server never issued"""
+    signed = TimestampSigner(main.settings.SECRET_KEY).sign(session_id.encode()).decode()
+    client.cookies.set("session", signed, domain="localhost.local")
+
+
+def test_planted_session_id_is_not_adopted(redis_server, client):
+    plant_cookie(client, "attacker-chosen-id")
+
+    # Anonymous visit that writes to the session (the login redirect target)
+    client.get("/dashboard", follow_redirects=False)
+
+    keys = stored_sessions(redis_server)
+    assert keys
+    assert b"session:attacker-chosen-id" not in keys
+
+
+def test_login_moves_session_to_a_new_id(redis_server, client):
+    signup(client)
+    client.get("/logout")
+
+    client.get("/dashboard", follow_redirects=False)
+    [before] = stored_sessions(redis_server)
+    cookie_before = client.cookies.get("session")
+
+    response = client.post(
+        "/login",
+        data={"email": "owner@example.com", "password": PASSWORD},
+        follow_redirects=False
+    )
+    assert response.status_code == 302
+
+    assert client.cookies.get("session") != cookie_before
+    assert before not in stored_sessions(redis_server)
+    assert client.get("/dashboard", follow_redirects=False).status_code == 200
+
+
+def test_logout_deletes_the_stored_session(redis_server, client):
+    signup(client)
+    assert stored_sessions(redis_server)
+
+    client.get("/logout")
+
+    assert stored_sessions(redis_server) == []
+    response = client.get("/dashboard", follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers["location"].startswith("/login")
+
+
+def test_redis_outage_serves_requests_without_a_session(redis_server, client):
+    signup(client)
+
+    redis_server.connected = False
+    try:
+        response = client.get("/dashboard", follow_redirects=False)
+        assert response.status_code == 302
+        assert response.headers["location"].startswith("/login")
+        assert client.get("/login").status_code == 200
+    finally:
+        redis_server.connected = True
+
+    # The stored session survived the outage
+    assert client.get("/dashboard", follow_redirects=False).status_code == 200
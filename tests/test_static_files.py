@@ -0,0 +1,104 @@
+import gzip
+import os
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+import main
+from precompress_static import precompress_static
+
+CSS = b"body { color: #333; }\n" * 50
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "site.css").write_bytes(CSS)
+    (tmp_path / "app.0123abcd.js").write_bytes(b"console.log(1);\n" * 50)
+    (tmp_path / "photo.jpeg").write_bytes(b"\xff\xd8 not really a jpeg")
+    return tmp_path
+
+
+@pytest.fixture
+def static_client(static_dir):
+    precompress_static(str(static_dir))
+    app = Starlette(routes=[
+        Mount("/static", main.CachedStaticFiles(directory=str(static_dir)))
+    ])
+    return TestClient(app)
+
+
+def test_precompress_writes_gz_siblings_for_text_assets_only(static_dir):
+    assert precompress_static(str(static_dir)) == 2
+
+    assert gzip.decompress((static_dir / "site.css.gz").read_bytes()) == CSS
+    assert not (static_dir / "photo.jpeg.gz").exists()
+    assert not list(static_dir.glob("*.tmp"))
+
+
+def test_precompress_skips_up_to_date_files_and_redoes_stale_ones(static_dir):
+    precompress_static(str(static_dir))
+    assert precompress_static(str(static_dir)) == 0
+
+    source = static_dir / "site.css"
+    source.write_bytes(CSS + b"a {}\n")
+    later = os.path.getmtime(static_dir / "site.css.gz") + 10
+    os.utime(source, (later, later))
+
+    assert precompress_static(str(static_dir)) == 1
+    assert gzip.decompress((static_dir / "site.css.gz").read_bytes()).endswith(b"a {}\n")
+
+
+@pytest.mark.parametrize("header, encoding, expected", [
+    ("gzip", "gzip", True),
+    ("gzip, deflate, br", "br", True),
+    ("GZIP;Q=0.5", "gzip", True),
+    ("gzip;q=0", "gzip", False),
+    ("gzip; q=0.0, br", "gzip", False),
+    ("deflate", "gzip", False),
+    ("*", "gzip", True),
+    ("*;q=0", "gzip", False),
+    ("*, gzip;q=0", "gzip", False),
+    ("x-gzip", "gzip", False),
+    ("", "gzip", False),
+])
+def test_accepts_encoding(header, encoding, expected):
+    assert main.accepts_encoding(header, encoding) is expected
+
+
+def test_serves_the_gzip_sibling_when_accepted(static_client):
+    response = static_client.get("/static/site.css", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["content-type"].startswith("text/css")
+    assert response.content == CSS  # httpx decodes it
+
+
+def test_refused_gzip_gets_the_plain_file(static_client):
+    response = static_client.get("/static/site.css", headers={"Accept-Encoding": "gzip;q=0"})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.content == CSS
+
+
+def test_encoded_response_revalidates_with_its_own_etag(static_client):
+    first = static_client.get("/static/site.css", headers={"Accept-Encoding": "gzip"})
+
+    second = static_client.get("/static/site.css", headers={
+        "Accept-Encoding": "gzip",
+        "If-None-Match": first.headers["etag"]
+    })
+
+    assert second.status_code == 304
+
+
+def test_cache_control_depends_on_fingerprint(static_client):
+    plain = static_client.get("/static/photo.jpeg")
+    hashed = static_client.get("/static/app.0123abcd.js")
+
+    assert plain.headers["cache-control"] == f"public, max-age={main.STATIC_MAX_AGE}"
+    assert hashed.headers["cache-control"] == "public, max-age=31536000, immutable"
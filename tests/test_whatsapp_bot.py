@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import pytest
+
+import main
+from main import WhatsAppBot
+
+
+class FrozenDatetime(datetime):
+    """Wednesday 10-06-2026, 09:00"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 6, 10, 9, 0)
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    monkeypatch.setattr(main, "datetime", FrozenDatetime)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("25/12 5pm Rahul", ("25-12-2026", "17:00", "Rahul")),
+    ("5-7 10:30 am priya sharma", ("05-07-2026", "10:30", "Priya Sharma")),
+    ("3 Aug 7pm Amit", ("03-08-2026", "19:00", "Amit")),
+    ("12 sep 9am neha", ("12-09-2026", "09:00", "Neha")),
+    ("Tomorrow 6pm Ravi", ("11-06-2026", "18:00", "Ravi")),
+    ("today 14:15 ravi", ("10-06-2026", "14:15", "Ravi")),
+    ("next friday 11am anu", ("12-06-2026", "11:00", "Anu")),
+    # Same weekday as today means a week ahead, not today
+    ("next wednesday 11am anu", ("17-06-2026", "11:00", "Anu")),
+    ("book me for 12am tomorrow 12am sam", ("11-06-2026", "00:00", "Sam")),
+    ("  TOMORROW 12pm SAM  ", ("11-06-2026", "12:00", "Sam")),
+])
+def test_parse_booking_formats(text, expected):
+    booking = WhatsAppBot.parse_booking(text)
+
+    assert (booking["date"], booking["time"], booking["name"]) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "hi",
+    "tomorrow evening",
+    "25/12 Rahul",
+    "next someday 5pm rahul",
+])
+def test_parse_booking_rejects_text_without_a_slot(text):
+    assert WhatsAppBot.parse_booking(text) is None
+
+
+@pytest.mark.parametrize("phone, expected", [
+    ("whatsapp:+919876543210", "+919876543210"),
+    ("98765 43210", "919876543210"),
+    ("(987) 654-3210", "919876543210"),
+    ("919876543210", "919876543210"),
+    ("+44 20 7946 0958", "+442079460958"),
+    # Non-ASCII input takes the regex path and must agree with the fast path
+    ("\u00a098765\u00a043210", "919876543210"),
+    ("whatsapp:+91\u202f98765\u202f43210", "+919876543210"),
+    ("", ""),
+    (None, ""),
+])
+def test_clean_phone(phone, expected):
+    assert WhatsAppBot.clean_phone(phone) == expected